@@ -0,0 +1,359 @@
+# Aggregation and reconciliation of Wahlbezirk-level Open Data results.
+# Loads the downloaded Open Data CSVs (from the content-addressed store, see
+# store.py) into a single long-format pandas table, aggregates the
+# Wahlbezirk rows up to Gemeinde / Wahlkreis / Land level and checks the sums
+# against the published Gemeinde-Ergebnis and Wahlkreis files.
+#
+# Wahlkreis totals come from the per-Wahlkreis Wahlbezirk files
+# ("Bezirke (Wahlkreise: 258)"). The Gemeinden found in them give an
+# AGS -> Wahlkreis mapping for every other municipality; an explicit mapping
+# can be passed with --wahlkreis-map (CSV with ags,wahlkreis columns).
+import argparse
+import csv
+import os
+import pickle
+import re
+
+import numpy as np
+import pandas as pd
+
+from download import DATA_LINKS_DIR, ROOT, iter_data_links
+from store import default_store
+
+OUT_DIR = os.path.join(ROOT, "2021", "summary_stats")
+CACHE_DIR = os.path.join(OUT_DIR, "analytics_cache")
+
+# link text (as written in the data_links files) -> aggregation level
+LEVEL_BY_TEXT = {
+    "Wahlbezirk": "bezirk",
+    "Übersicht über Wahlbezirke": "bezirk",
+    "Gemeinde-Ergebnis": "gemeinde",
+    "Gemeinde": "gemeinde",
+    "Stadt": "gemeinde",
+    "Wahlkreis": "wahlkreis",
+    "Übersicht über Wahlkreise": "wahlkreis",
+}
+# Municipality totals under other names, used only when the page has no file
+# from LEVEL_BY_TEXT for that level: "Wahlgebiet" (komm.one, e.g. Stuttgart)
+# and "Gesamtergebnis" are the Gemeinde total on a Gemeinde page, but on a
+# Landkreis page (Landkreis Stendal) "Gesamtergebnis" is the Kreis total
+# next to a per-Gemeinde file. "Kreis-Ergebnis" is always a Kreis total and
+# those pages have no Wahlbezirk file to compare with, so it is not mapped.
+LEVEL_FALLBACK_TEXT = {
+    "Wahlgebiet": "gemeinde",
+    "Gesamtergebnis": "gemeinde",
+}
+# Per-Wahlkreis splits, matched by prefix. "Gemeinden (Wahlkreis: 066)" is
+# only used when the page has no exact Wahlkreis file (otherwise the published
+# totals would be counted twice). "Bezirke (Wahlkreise: 258)" has a level of
+# its own: it tags Wahlbezirke with their Wahlkreis for the Wahlkreis totals
+# and stands in for the Wahlbezirk file of pages that have none.
+LEVEL_BY_PREFIX = {
+    "Bezirke (Wahlkreis": "bezirk_wk",
+    "Gemeinden (Wahlkreis": "wahlkreis",
+}
+WAHLKREIS_IN_TEXT = re.compile(r"Wahlkreise?:\s*(\d+)")
+
+# votemanager count columns: A (Wahlberechtigte), B (Wähler), C/D (Erststimmen),
+# E/F (Zweitstimmen) plus numbered sub-columns (A1, D3, F12, ...)
+COUNT_COLUMN = re.compile(r"^[A-Z]\d*$")
+KEY_COLUMNS = ["ags", "gebiet-nr", "gebiet-name"]
+LONG_COLUMNS = ["muni", "level", "wahlkreis"] + KEY_COLUMNS + ["column", "value"]
+GEMEINDE_COLUMNS = ["muni", "column", "bezirk_sum", "ags"]
+# Wahlbezirk sums per municipality, Gemeinde (AGS) and Wahlkreis from the split files
+WK_PART_COLUMNS = ["muni", "ags", "wahlkreis", "column", "bezirk_sum"]
+WAHLKREIS_COLUMNS = ["wahlkreis", "column", "bezirk_sum"]
+RECONCILIATION_COLUMNS = ["muni", "level", "column", "bezirk_sum", "published", "diff", "ok", "status"]
+# bumped when the cached per-municipality results change shape
+CACHE_VERSION = 4
+
+# Tolerance (absolute votes) below which a difference is not reported
+DEFAULT_TOLERANCE = 0
+
+# In-process memo: muni -> (signature, results dict)
+_MEMO = {}
+
+
+def link_level(text: str):
+    """(level, exact) for a data_links link text, or (None, False) if it is not a result file."""
+    text = (text or "").strip()
+    if text in LEVEL_BY_TEXT:
+        return LEVEL_BY_TEXT[text], True
+    if text in LEVEL_FALLBACK_TEXT:
+        return LEVEL_FALLBACK_TEXT[text], False
+    for prefix, level in LEVEL_BY_PREFIX.items():
+        if text.startswith(prefix):
+            return level, False
+    return None, False
+
+
+def wahlkreis_of(text: str) -> str:
+    """Wahlkreis number named in a link text ('Bezirke (Wahlkreis: 066)' -> '66'), or ''."""
+    m = WAHLKREIS_IN_TEXT.search(text or "")
+    return str(int(m.group(1))) if m else ""
+
+
+def result_files(muni: str, rows):
+    """
+    Pick the Bundestagswahl result files of one municipality that are in the store.
+    Returns a list of (level, sha256, wahlkreis) tuples; wahlkreis is '' unless
+    the link text names one.
+    """
+    st = default_store()
+    exact, split = [], []
+    for r in rows:
+        level, is_exact = link_level(r.get("text"))
+        url = r.get("url") or ""
+        # data_links files also list Landtags-/Bürgermeisterwahlen on the same page
+        if not level or "bundestag" not in url.lower():
+            continue
+        digest = st.lookup(muni, url)
+        if digest:
+            (exact if is_exact else split).append((level, digest, wahlkreis_of(r.get("text"))))
+    have = {f[0] for f in exact}
+    return exact + [f for f in split if f[0] not in have]
+
+
+def files_signature(files):
+    """Change detector for a municipality: the content hashes of its inputs."""
+    return (CACHE_VERSION,) + tuple(sorted(files))
+
+
+def read_result_csv(digest: str) -> pd.DataFrame:
+    """Read one votemanager Open Data CSV (semicolon separated, utf-8 or latin-1) from the store."""
+    st = default_store()
+    for enc in ("utf-8-sig", "latin-1"):
+        try:
+            with st.open_stream(digest) as f:
+                df = pd.read_csv(f, sep=";", dtype=str, encoding=enc)
+            break
+        except UnicodeDecodeError:
+            continue
+    df.columns = [c.strip() for c in df.columns]
+    return df
+
+
+def to_long(df: pd.DataFrame, muni: str, level: str, wahlkreis: str = "") -> pd.DataFrame:
+    """Melt the wide votemanager table into (muni, level, ags, gebiet-nr, column, value) rows."""
+    keys = [c for c in KEY_COLUMNS if c in df.columns]
+    counts = [c for c in df.columns if COUNT_COLUMN.match(c)]
+    long = df[keys + counts].melt(id_vars=keys, var_name="column", value_name="value")
+    long["value"] = pd.to_numeric(long["value"], errors="coerce").fillna(0).astype(np.int64)
+    for c in KEY_COLUMNS:
+        if c not in long.columns:
+            long[c] = ""
+    long["muni"] = muni
+    long["level"] = level
+    long["wahlkreis"] = wahlkreis
+    return long[LONG_COLUMNS]
+
+
+def load_muni(muni: str, files) -> pd.DataFrame:
+    frames = [to_long(read_result_csv(digest), muni, level, wk) for level, digest, wk in files]
+    if not frames:
+        return pd.DataFrame(columns=LONG_COLUMNS)
+    return pd.concat(frames, ignore_index=True)
+
+
+def aggregate(long: pd.DataFrame, wahlkreis_map=None, tolerance: int = DEFAULT_TOLERANCE):
+    """
+    Vectorized group-bys and reconciliation over all municipalities in `long`.
+
+    Returns a dict of DataFrames:
+      gemeinde       - Wahlbezirk rows summed per municipality and column
+      wk_parts       - Wahlbezirk sums per municipality, AGS and Wahlkreis (split files)
+      wahlkreis      - Wahlbezirk sums per Wahlkreis (see rollup)
+      land           - Wahlbezirk sums per Land (first two digits of the AGS)
+      reconciliation - Wahlbezirk sums vs. published Gemeinde-Ergebnis / Wahlkreis files
+    """
+    # the per-Wahlkreis Bezirke files count for the Gemeinde sums only on pages
+    # without a plain Wahlbezirk file, where they cover the same Wahlbezirke
+    level = long["level"]
+    has_bezirk = long.loc[level == "bezirk", "muni"].unique()
+    bezirk = long[(level == "bezirk") | ((level == "bezirk_wk") & ~long["muni"].isin(has_bezirk))]
+    gemeinde = (bezirk.groupby(["muni", "column"], sort=False)["value"].sum()
+                .rename("bezirk_sum").reset_index())
+    gemeinde["ags"] = gemeinde["muni"].map(
+        bezirk.groupby("muni")["ags"].first()).fillna("")
+
+    checks = []
+    published = long[long["level"] == "gemeinde"]
+    if not published.empty:
+        # a Gemeinde-Ergebnis file has one row per municipality; sum guards against repeats
+        pub = (published.groupby(["muni", "column"], sort=False)["value"].sum()
+               .rename("published").reset_index())
+        # outer: a municipality with only one side shows up as missing_input
+        checks.append(("gemeinde", gemeinde.merge(pub, on=["muni", "column"], how="outer")))
+
+    # Wahlkreis files split a municipality that spans several Wahlkreise; their
+    # rows must add up to the same totals as the Wahlbezirke
+    wk_pub = long[long["level"] == "wahlkreis"]
+    if not wk_pub.empty:
+        pub = (wk_pub.groupby(["muni", "column"], sort=False)["value"].sum()
+               .rename("published").reset_index())
+        # right: a Wahlkreis file without Wahlbezirke is missing_input, as for the
+        # Gemeinde check; pages without a Wahlkreis file are not listed twice
+        checks.append(("wahlkreis", gemeinde.merge(pub, on=["muni", "column"], how="right")))
+
+    frames = []
+    for level, df in checks:
+        df = df.copy()
+        df["level"] = level
+        # nullable ints: a side that is missing stays <NA> instead of a sentinel
+        df[["bezirk_sum", "published"]] = df[["bezirk_sum", "published"]].astype("Int64")
+        df["diff"] = df["bezirk_sum"] - df["published"]
+        missing = df["diff"].isna()
+        df["ok"] = (~missing & (df["diff"].abs() <= tolerance).fillna(False)).astype(bool)
+        df["status"] = np.select([missing, df["ok"]], ["missing_input", "ok"], default="mismatch")
+        frames.append(df[RECONCILIATION_COLUMNS])
+    reconciliation = (pd.concat(frames, ignore_index=True) if frames else
+                      pd.DataFrame(columns=RECONCILIATION_COLUMNS))
+
+    wk_parts = (long[level == "bezirk_wk"]
+                .groupby(["muni", "ags", "wahlkreis", "column"], sort=False)["value"].sum()
+                .rename("bezirk_sum").reset_index())
+
+    wahlkreis, land = rollup(gemeinde, wk_parts, wahlkreis_map)
+    return {"gemeinde": gemeinde, "wk_parts": wk_parts, "wahlkreis": wahlkreis, "land": land,
+            "reconciliation": reconciliation}
+
+
+def derive_wahlkreis_map(wk_parts: pd.DataFrame) -> dict:
+    """AGS -> Wahlkreis for every Gemeinde that lies in exactly one Wahlkreis of the split files."""
+    pairs = wk_parts.loc[wk_parts["ags"].astype(str) != "", ["ags", "wahlkreis"]].drop_duplicates()
+    single = pairs[~pairs["ags"].duplicated(keep=False)]
+    return dict(zip(single["ags"], single["wahlkreis"]))
+
+
+def rollup(gemeinde: pd.DataFrame, wk_parts: pd.DataFrame, wahlkreis_map=None):
+    """
+    Sum Gemeinde totals up to Land, and up to Wahlkreis: Gemeinden covered by
+    the split files count with their per-Wahlkreis sums, every other Gemeinde
+    with its total under the Wahlkreis of its AGS (derived from the split
+    files, explicit wahlkreis_map entries win).
+    """
+    land = gemeinde.assign(land=gemeinde["ags"].astype(str).str[:2])
+    land = land.groupby(["land", "column"], sort=False)["bezirk_sum"].sum().reset_index()
+
+    mapping = derive_wahlkreis_map(wk_parts)
+    mapping.update({str(k): str(v) for k, v in (wahlkreis_map or {}).items()})
+    # a Gemeinde listed on several pages (Landkreis and its own) counts once
+    split = wk_parts.drop_duplicates(subset=["ags", "wahlkreis", "column"])
+    rest = gemeinde[~gemeinde["ags"].isin(split["ags"])]
+    rest = rest.assign(wahlkreis=rest["ags"].map(mapping)).dropna(subset=["wahlkreis"])
+    parts = pd.concat([split[WAHLKREIS_COLUMNS], rest[WAHLKREIS_COLUMNS]], ignore_index=True)
+    wahlkreis = parts.groupby(["wahlkreis", "column"], sort=False)["bezirk_sum"].sum().reset_index()
+    return wahlkreis, land
+
+
+def load_wahlkreis_map(path: str) -> dict:
+    """ags -> Wahlkreis-Nr from a CSV with ags,wahlkreis columns."""
+    with open(path, newline="", encoding="utf-8") as f:
+        return {r["ags"].strip(): str(int(r["wahlkreis"])) for r in csv.DictReader(f)
+                if r.get("ags") and r.get("wahlkreis")}
+
+
+def _cache_path(muni: str) -> str:
+    return os.path.join(CACHE_DIR, f"{muni.replace('/', '_')}.pkl")
+
+
+def _load_cached(muni: str, sig):
+    if muni in _MEMO and _MEMO[muni][0] == sig:
+        return _MEMO[muni][1]
+    try:
+        with open(_cache_path(muni), "rb") as f:
+            cached_sig, result = pickle.load(f)
+    except Exception:
+        return None
+    if cached_sig != sig:
+        return None
+    _MEMO[muni] = (sig, result)
+    return result
+
+
+def _store_cached(muni: str, sig, result):
+    _MEMO[muni] = (sig, result)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(_cache_path(muni), "wb") as f:
+        pickle.dump((sig, result), f)
+
+
+def run(data_links_dir: str = DATA_LINKS_DIR, wahlkreis_map=None, tolerance: int = DEFAULT_TOLERANCE,
+        use_cache: bool = True):
+    """
+    Aggregate and reconcile every municipality with downloaded files.
+
+    Per-municipality results (Gemeinde sums and reconciliation rows) are memoized
+    by the content hashes of their input files, so after a partial re-download
+    only the municipalities whose files changed are parsed and grouped again. The Land and
+    Wahlkreis levels are rebuilt from the (cheap) cached Gemeinde and per-Wahlkreis sums
+    every time.
+    """
+    cached, stale, sigs = [], [], {}
+    for muni, rows in iter_data_links(data_links_dir):
+        files = result_files(muni, rows)
+        if not files:
+            continue
+        sig = files_signature(files)
+        hit = _load_cached(muni, sig) if use_cache else None
+        if hit is not None:
+            cached.append(hit)
+        else:
+            stale.append(load_muni(muni, files))
+            sigs[muni] = sig
+
+    if stale:
+        fresh = aggregate(pd.concat(stale, ignore_index=True), tolerance=tolerance)
+        # one group-by per frame instead of a mask over all rows per municipality
+        split = {k: dict(tuple(fresh[k].groupby("muni", sort=False)))
+                 for k in ("gemeinde", "wk_parts", "reconciliation")}
+        for muni, sig in sigs.items():
+            part = {k: split[k].get(muni, fresh[k].iloc[:0]) for k in split}
+            cached.append(part)
+            if use_cache:
+                _store_cached(muni, sig, part)
+
+    gemeinde = pd.concat([p["gemeinde"] for p in cached] or [pd.DataFrame(columns=GEMEINDE_COLUMNS)],
+                         ignore_index=True)
+    wk_parts = pd.concat([p["wk_parts"] for p in cached] or [pd.DataFrame(columns=WK_PART_COLUMNS)],
+                         ignore_index=True)
+    reconciliation = pd.concat([p["reconciliation"] for p in cached] or
+                               [pd.DataFrame(columns=RECONCILIATION_COLUMNS)], ignore_index=True)
+    wahlkreis, land = rollup(gemeinde, wk_parts, wahlkreis_map)
+
+    return {"gemeinde": gemeinde, "wahlkreis": wahlkreis, "land": land,
+            "reconciliation": reconciliation, "recomputed": sorted(sigs)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Aggregate and reconcile the downloaded Open Data files")
+    parser.add_argument("--wahlkreis-map", help="CSV with ags,wahlkreis columns (added to the mapping "
+                                                "derived from the per-Wahlkreis files)")
+    parser.add_argument("--tolerance", type=int, default=DEFAULT_TOLERANCE,
+                        help="absolute difference still reported as ok")
+    args = parser.parse_args(argv)
+    wahlkreis_map = load_wahlkreis_map(args.wahlkreis_map) if args.wahlkreis_map else None
+    results = run(wahlkreis_map=wahlkreis_map, tolerance=args.tolerance)
+    os.makedirs(OUT_DIR, exist_ok=True)
+    for name in ("gemeinde", "wahlkreis", "land", "reconciliation"):
+        df = results[name]
+        if df is None:
+            continue
+        out_csv = os.path.join(OUT_DIR, f"{name}_totals.csv" if name != "reconciliation" else "reconciliation.csv")
+        df.to_csv(out_csv, index=False)
+        print(f"Wrote {len(df)} rows to {out_csv}")
+
+    rec = results["reconciliation"]
+    bad = rec[rec["status"] == "mismatch"]
+    missing = rec[rec["status"] == "missing_input"]["muni"].unique()
+    print(f"Recomputed {len(results['recomputed'])} municipalities, "
+          f"{rec[rec['status'] != 'missing_input']['muni'].nunique()} reconciled, "
+          f"{bad['muni'].nunique()} with mismatches, {len(missing)} with only one side "
+          f"(no Wahlbezirk or no published file)")
+    for muni, grp in list(bad.groupby("muni"))[:50]:
+        cols = ", ".join(f"{r.column}({r.level}):{r.bezirk_sum}/{r.published}" for r in grp.itertuples())
+        print(f"  {muni}: {cols}")
+
+
+if __name__ == "__main__":
+    main()
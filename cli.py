@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""Command line entry point for the Bundestag scraper.
+
+    python cli.py harvest                       # rebuild municipality_names_with_page.csv
+    python cli.py scrape --range 2975 3000      # collect data_links (END exclusive)
+    python cli.py check                         # 2021/summary_stats/munis_check.csv
+    python cli.py download --workers 8          # fetch Open Data files into the store
+    python cli.py store                         # store size / dedup statistics
+    python cli.py bench --backend replay        # time the scraper over a range
+    python cli.py netreport                     # slowest hosts from --capture-network
+    python cli.py doctor                        # environment + driver smoke test
+
+Only the standard library is imported at startup; selenium and the browser
+stack are loaded by the subcommands that drive a browser.
+"""
+import argparse
+import glob
+import importlib.util
+import os
+import shutil
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+BACKENDS = ("chrome", "remote", "replay", "tabs")
+
+
+def _load_scraper(args):
+    """Import the scraper module and apply the --backend/--record options."""
+    import scraper_codespaces as sc
+
+    # no --backend: chrome, or replay when SCRAPER_PAGE_MODE=replay is set
+    if args.backend is None:
+        args.backend = "replay" if sc.PAGE_MODE == "replay" else "chrome"
+    if args.backend == "remote":
+        url = args.remote_url or os.environ.get("CHROME_REMOTE_URL") or os.environ.get("CHROMEDRIVER_REMOTE_URL")
+        if not url:
+            raise SystemExit("--backend remote needs --remote-url or CHROME_REMOTE_URL")
+        os.environ["CHROME_REMOTE_URL"] = url
+    elif args.backend == "chrome":
+        os.environ.pop("CHROME_REMOTE_URL", None)
+        os.environ.pop("CHROMEDRIVER_REMOTE_URL", None)
+
+    # without --record / --backend replay keep SCRAPER_PAGE_MODE from the environment
+    mode = sc.PAGE_MODE
+    if args.backend == "replay":
+        mode = "replay"
+    elif getattr(args, "record", False):
+        mode = "record"
+    elif mode == "replay":
+        raise SystemExit(f"SCRAPER_PAGE_MODE=replay conflicts with --backend {args.backend}")
+    sc.configure_page_archive(mode, args.archive or sc.PAGE_ARCHIVE_DIR)
+    sc.configure_tab_pool(args.backend == "tabs")
+    _configure_throttle(args)
+    if getattr(args, "capture_network", False):
+        sc.configure_network_capture(True)
+    return sc
+
+
+def _configure_throttle(args):
+    import throttle
+    throttle.configure(enabled=not getattr(args, "no_throttle", False),
+                       max_limit=getattr(args, "max_per_host", None))
+
+
+def _indices(args, sc):
+    start, end = args.range or sc.DEFAULT_RANGE
+    return list(range(start, end))
+
+
+def cmd_harvest(args):
+    sc = _load_scraper(args)
+    sc.harvest_municipality_list(args.output, args.max_pages)
+
+
+def cmd_scrape(args):
+    sc = _load_scraper(args)
+    sc.run(_indices(args, sc), workers=args.workers, resume=not args.no_resume)
+
+
+def cmd_check(args):
+    import check_data_links
+    check_data_links.main()
+
+
+def cmd_download(args):
+    import download
+    _configure_throttle(args)
+    download.download_all(munis=set(args.muni) if args.muni else None, workers=args.workers,
+                          overwrite=args.overwrite, only_bundestag=not args.all_elections)
+
+
+def cmd_bench(args):
+    sc = _load_scraper(args)
+    indices = sc.replayable(_indices(args, sc))
+    print(f"Benchmarking {len(indices)} municipalities, backend={args.backend}, workers={args.workers}")
+
+    def timed(idx):
+        t0 = time.perf_counter()
+        sc.scrape_single_muni(idx)
+        return time.perf_counter() - t0
+
+    start = time.perf_counter()
+    try:
+        if args.workers > 1:
+            import concurrent.futures
+            with concurrent.futures.ThreadPoolExecutor(max_workers=args.workers) as pool:
+                durations = list(pool.map(timed, indices))
+        else:
+            durations = [timed(idx) for idx in indices]
+    finally:
+        sc.shutdown_tab_pool()
+    total = time.perf_counter() - start
+    sc.throttle.THROTTLE.print_metrics()
+
+    if not durations:
+        print("Nothing to benchmark")
+        return
+    durations.sort()
+    p50 = durations[len(durations) // 2]
+    p95 = durations[min(len(durations) - 1, int(len(durations) * 0.95))]
+    print(f"total={total:.2f}s  munis/s={len(durations) / total:.2f}  "
+          f"mean={sum(durations) / len(durations):.3f}s  p50={p50:.3f}s  p95={p95:.3f}s  max={durations[-1]:.3f}s")
+
+
+def cmd_store(args):
+    import download
+    import store
+
+    st = store.default_store()
+    if args.import_opendata:
+        n = st.ingest_dir(download.iter_data_links(), download.local_path_for)
+        print(f"Moved {n} files from {download.OPENDATA_DIR} into the store")
+        try:
+            os.rmdir(download.OPENDATA_DIR)
+        except OSError:
+            pass  # missing, or holds files no data_links entry points to
+    if args.verify:
+        # check what `download` fetches: other elections' rows are counted apart
+        links, skipped = [], 0
+        for muni, rows in download.iter_data_links():
+            wanted = [r for r in rows if download.is_wanted(r["url"], not args.all_elections)]
+            skipped += len(rows) - len(wanted)
+            links.append((muni, wanted))
+        resolved, missing = st.verify(links)
+        print(f"{resolved} data_links entries resolve to a stored file, {len(missing)} do not"
+              f" ({skipped} other-election entries not checked, see --all-elections)")
+        for muni, text, url in missing[:args.top]:
+            print(f"  {muni}: {text} {url}")
+    s = st.stats()
+    ratio = s["logical_bytes"] / s["stored_bytes"] if s["stored_bytes"] else 0
+    print(f"{s['links']} links -> {s['objects']} objects; {s['logical_bytes'] / 1e6:.1f} MB linked, "
+          f"{s['unique_bytes'] / 1e6:.1f} MB distinct, {s['stored_bytes'] / 1e6:.1f} MB on disk ({ratio:.1f}x)")
+
+
+def cmd_netreport(args):
+    import netcapture
+    netcapture.report(args.file, top=args.top)
+
+
+def _print_latest_chromedriver_log():
+    logs = sorted(glob.glob("/tmp/chromedriver_*.log"), key=os.path.getmtime, reverse=True)
+    if not logs:
+        print("No chromedriver logs found in /tmp")
+        return
+    log = logs[0]
+    print("Found chromedriver log:", log)
+    try:
+        with open(log, "rb") as f:
+            data = f.read(2048)
+        print("--- first 2KB of chromedriver log ---")
+        print(data.decode("utf-8", errors="replace"))
+        print("--- end log snippet ---")
+    except Exception as e:
+        print("Could not read log file:", e)
+
+
+def cmd_doctor(args):
+    """Report missing packages/binaries, then start a driver and load a test page."""
+    for mod in ("selenium", "webdriver_manager", "tqdm", "pandas", "numpy", "lxml", "cssselect", "zstandard"):
+        found = importlib.util.find_spec(mod) is not None
+        print(f"{'ok' if found else 'missing':8} python package {mod}")
+    for name in ("chromium-browser", "chromium", "google-chrome", "chromedriver"):
+        print(f"{'ok' if shutil.which(name) else 'missing':8} binary {name}")
+    if args.skip_driver:
+        return 0
+
+    sc = _load_scraper(args)
+    print("Starting driver ...")
+    try:
+        driver, profile_dir = sc.get_chrome_driver()
+    except Exception as e:
+        print("Driver failed to start:", repr(e))
+        _print_latest_chromedriver_log()
+        return 2
+    try:
+        print(f"Driver started. Navigating to {args.url} ...")
+        driver.get(args.url)
+        print("Title:", driver.title)
+    except Exception as e:
+        print("Navigation failed:", repr(e))
+        _print_latest_chromedriver_log()
+        return 2
+    finally:
+        sc.safe_quit(driver, profile_dir)
+    print("Driver quit cleanly, profile removed:", profile_dir)
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Bundestagswahl 2021 votemanager scraper")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def browser_options(p):
+        p.add_argument("--backend", choices=BACKENDS,
+                       help="chrome (default): one local Chrome per worker; tabs: one Chrome, one tab per worker; "
+                            "remote: CHROME_REMOTE_URL; replay: recorded pages")
+        p.add_argument("--remote-url", help="chromedriver/Selenium server URL for --backend remote")
+        p.add_argument("--archive", help="page archive folder (default 2021/page_archive)")
+
+    def throttle_options(p):
+        p.add_argument("--max-per-host", type=float,
+                       help="upper bound for the adaptive per-host concurrency (default 8)")
+        p.add_argument("--no-throttle", action="store_true", help="disable the per-host AIMD limits")
+
+    def range_options(p):
+        p.add_argument("--range", nargs=2, type=int, metavar=("START", "END"),
+                       help="municipality numbers START..END-1 (default: scraper_codespaces.DEFAULT_RANGE)")
+        p.add_argument("--workers", type=int, default=1,
+                       help="parallel municipalities (browsers, or tabs with --backend tabs)")
+        p.add_argument("--capture-network", action="store_true",
+                       help="record DevTools network timings to 2021/network/requests.jsonl")
+        throttle_options(p)
+
+    p = sub.add_parser("harvest", help="rebuild the municipality list from the votemanager listing")
+    browser_options(p)
+    p.add_argument("--output", help="output CSV (default municipality_names_with_page.csv)")
+    p.add_argument("--max-pages", type=int, help="stop after this many listing pages")
+    p.set_defaults(func=cmd_harvest)
+
+    p = sub.add_parser("scrape", help="collect Open Data links for a range of municipalities")
+    browser_options(p)
+    range_options(p)
+    p.add_argument("--record", action="store_true", help="save visited pages to the page archive")
+    p.add_argument("--no-resume", action="store_true", help="also redo municipalities already in the log (replay never resumes)")
+    p.set_defaults(func=cmd_scrape)
+
+    p = sub.add_parser("check", help="match municipalities against data_links and the scrape log")
+    p.set_defaults(func=cmd_check)
+
+    p = sub.add_parser("download", help="download the files listed in 2021/data_links")
+    p.add_argument("--workers", type=int, default=16, help="download threads (per-host limits still apply)")
+    p.add_argument("--muni", action="append", help="only this municipality (data_links name, repeatable)")
+    p.add_argument("--overwrite", action="store_true", help="re-download files already on disk")
+    p.add_argument("--all-elections", action="store_true", help="also Landtags-/Bürgermeisterwahl files")
+    throttle_options(p)
+    p.set_defaults(func=cmd_download)
+
+    p = sub.add_parser("store", help="content-addressed file store: stats, import, verify")
+    p.add_argument("--import-opendata", action="store_true",
+                   help="move files from the old 2021/opendata/<municipality>/ layout into the store")
+    p.add_argument("--verify", action="store_true", help="check that every data_links URL and link name resolves to a stored file")
+    p.add_argument("--top", type=int, default=20, help="missing entries to list with --verify")
+    p.add_argument("--all-elections", action="store_true",
+                   help="with --verify, also check Landtags-/Bürgermeisterwahl entries")
+    p.set_defaults(func=cmd_store)
+
+    p = sub.add_parser("bench", help="time scrape_single_muni over a range")
+    browser_options(p)
+    range_options(p)
+    p.set_defaults(func=cmd_bench)
+
+    p = sub.add_parser("netreport", help="rank slowest hosts/resources from --capture-network runs")
+    p.add_argument("--file", help="requests.jsonl (default 2021/network/requests.jsonl)")
+    p.add_argument("--top", type=int, default=20)
+    p.set_defaults(func=cmd_netreport)
+
+    p = sub.add_parser("doctor", help="check packages/binaries and run a driver smoke test")
+    browser_options(p)
+    p.add_argument("--url", default="https://example.org")
+    p.add_argument("--skip-driver", action="store_true", help="only report packages and binaries")
+    p.set_defaults(func=cmd_doctor)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args) or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+# Download the Open Data files listed in 2021/data_links into the content-addressed
+# store (store.py). Standard library only (zstandard optional), so it can run
+# without the browser stack installed.
+import csv
+import os
+import threading
+import time
+import urllib.request
+import urllib.error
+from collections import deque
+from urllib.parse import urlsplit
+
+import store
+import throttle
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DATA_LINKS_DIR = os.path.join(ROOT, "2021", "data_links")
+# old one-folder-per-municipality layout, read by `cli.py store --import-opendata`
+OPENDATA_DIR = os.path.join(ROOT, "2021", "opendata")
+
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) bundestag-scraper"
+TIMEOUT = 30
+# extra tries for timeouts/429/5xx after the host's limit has been cut
+RETRIES = 2
+# how long an idle worker sleeps when every host with pending files is at its limit
+POLL_INTERVAL = 0.05
+
+
+def muni_from_links_file(fname: str) -> str:
+    return fname[: -len("_data_links.csv")]
+
+
+def local_path_for(muni: str, url: str) -> str:
+    """Where the old layout kept the downloaded file for `url` of municipality `muni`."""
+    name = os.path.basename(urlsplit(url).path) or "index.csv"
+    return os.path.join(OPENDATA_DIR, muni, name)
+
+
+def load_data_links(path: str):
+    with open(path, newline="", encoding="utf-8") as f:
+        return [r for r in csv.DictReader(f) if r.get("url")]
+
+
+def iter_data_links(data_links_dir: str = DATA_LINKS_DIR):
+    """Yield (muni, rows) for every *_data_links.csv file, sorted by name."""
+    if not os.path.isdir(data_links_dir):
+        return
+    for fname in sorted(os.listdir(data_links_dir)):
+        if not fname.endswith("_data_links.csv"):
+            continue
+        yield muni_from_links_file(fname), load_data_links(os.path.join(data_links_dir, fname))
+
+
+def is_wanted(url: str, only_bundestag: bool = True) -> bool:
+    """Whether download_all fetches `url` (by default only Bundestag files)."""
+    name = os.path.basename(urlsplit(url).path)
+    # opendata-wahllokale/strassen are election independent, keep them
+    return not only_bundestag or "bundestag" in url.lower() or name.startswith("opendata-")
+
+
+def fetch(url: str) -> bytes:
+    req = urllib.request.Request(url, headers={"User-Agent": USER_AGENT})
+    for attempt in range(RETRIES + 1):
+        try:
+            # one slot per request; the per-host limit adapts to timeouts/429/5xx
+            with throttle.THROTTLE.slot(url):
+                with urllib.request.urlopen(req, timeout=TIMEOUT) as resp:
+                    return resp.read()
+        except (urllib.error.URLError, TimeoutError) as e:
+            if attempt == RETRIES or not throttle.is_throttle_error(e):
+                raise
+            time.sleep(2 ** attempt)
+
+
+def download_one(muni: str, text: str, url: str, overwrite: bool = False):
+    """
+    Download one file into the store; returns (status, sha256) with status in
+    downloaded/exists/linked/failed: <msg>. "linked" means another municipality
+    already fetched the same URL (ignoring ?ts=) and the object is reused.
+    """
+    st = store.default_store()
+    if not overwrite:
+        digest = st.lookup(muni, url)
+        if digest and st.object_path(digest):
+            return "exists", digest
+        row = st.lookup_any(url)
+        if row and st.object_path(row["sha256"]):
+            return "linked", st.link(muni, text, url, row["sha256"], row["size"])
+    try:
+        data = fetch(url)
+    except Exception as e:
+        return f"failed: {e}", None
+    return "downloaded", st.add(muni, text, url, data)
+
+
+class HostQueues:
+    """
+    Pending jobs queued per host. take() hands out the next job of a host that
+    has a free throttle slot, rotating over hosts, so workers never sit blocked
+    on one busy host while files from other hosts are waiting.
+    """
+
+    def __init__(self, jobs):
+        self._lock = threading.Lock()
+        self._queues = {}
+        for job in jobs:
+            self._queues.setdefault(throttle.host_of(job[2]), deque()).append(job)
+        self.hosts = len(self._queues)
+
+    def take(self):
+        while True:
+            with self._lock:
+                if not self._queues:
+                    return None
+                for host in list(self._queues):
+                    if throttle.THROTTLE.has_capacity(host):
+                        queue = self._queues.pop(host)
+                        job = queue.popleft()
+                        if queue:
+                            # back to the end: round robin over hosts
+                            self._queues[host] = queue
+                        return job
+            time.sleep(POLL_INTERVAL)
+
+
+def download_all(munis=None, workers: int = 16, overwrite: bool = False, only_bundestag: bool = True,
+                 data_links_dir: str = DATA_LINKS_DIR):
+    """Download every linked file (optionally only for the given municipality names)."""
+    jobs = []
+    for muni, rows in iter_data_links(data_links_dir):
+        if munis and muni not in munis:
+            continue
+        for r in rows:
+            if is_wanted(r["url"], only_bundestag):
+                jobs.append((muni, r.get("text", ""), r["url"]))
+
+    queues = HostQueues(jobs)
+    print(f"{len(jobs)} files from {queues.hosts} hosts to fetch with {workers} workers")
+    counts = {"downloaded": 0, "exists": 0, "linked": 0, "failed": 0}
+    counts_lock = threading.Lock()
+
+    def worker():
+        while True:
+            job = queues.take()
+            if job is None:
+                return
+            muni, text, url = job
+            status, _ = download_one(muni, text, url, overwrite)
+            with counts_lock:
+                if status.startswith("failed"):
+                    counts["failed"] += 1
+                    print(f"{muni}: {url} {status}")
+                else:
+                    counts[status] += 1
+
+    start = time.time()
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(max(1, workers))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    print(f"Done in {time.time() - start:.1f}s: {counts}")
+    throttle.THROTTLE.print_metrics()
+    return counts
+
+
+def main():
+    download_all()
+
+
+if __name__ == "__main__":
+    main()
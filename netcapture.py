@@ -0,0 +1,272 @@
+# Network timing capture from Chrome's DevTools performance log.
+#
+# With capture enabled, get_chrome_driver() turns on the "performance" log
+# (goog:loggingPrefs), and at every navigation step of scrape_single_muni the
+# buffered Network.* events are drained and reduced to one compact HAR-style
+# line per request in 2021/network/requests.jsonl:
+#   idx, attempt, step, url, host, type, status, dns/connect/ssl/ttfb/download/total (ms), bytes, blocking
+# report() ranks the slowest hosts and resources over a whole run.
+import json
+import os
+import threading
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+NETWORK_DIR = os.path.join(ROOT, "2021", "network")
+REQUESTS_FILE = "requests.jsonl"
+
+# resource types that hold up the first render when requested before DOMContentLoaded
+BLOCKING_TYPES = ("Script", "Stylesheet")
+STATIC_TYPES = ("Script", "Stylesheet", "Image", "Font", "Media")
+
+
+def enable(options):
+    """Ask chromedriver to buffer DevTools network/page events (ChromeOptions)."""
+    options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
+
+def _ms(value):
+    return round(value, 1) if value is not None and value >= 0 else None
+
+
+def _span(timing, start, end):
+    if not timing or timing.get(start, -1) < 0 or timing.get(end, -1) < 0:
+        return None
+    return _ms(timing[end] - timing[start])
+
+
+def new_pages():
+    """Navigation state for collect(): the current main-frame document and each document's DOMContentLoaded."""
+    return {"nav": 0, "dcl": {}}
+
+
+def collect(entries, requests, pages):
+    """
+    Fold raw performance log entries into `requests` (requestId -> partial
+    record), which may hold requests from earlier drains that had not finished
+    yet. `pages` (see new_pages) numbers the main-frame navigations: every
+    request is tagged with the document it was made for, and the first
+    DOMContentLoaded of each document is kept.
+    """
+    for entry in entries:
+        try:
+            msg = json.loads(entry["message"])["message"]
+        except Exception:
+            continue
+        method = msg.get("method", "")
+        params = msg.get("params", {})
+        if method == "Page.frameNavigated":
+            # a frame without parent is the tab's document: a new page starts
+            if not params.get("frame", {}).get("parentId"):
+                pages["nav"] += 1
+            continue
+        if method == "Page.domContentEventFired":
+            pages["dcl"].setdefault(pages["nav"], params.get("timestamp"))
+            continue
+        rid = params.get("requestId")
+        if not rid:
+            continue
+        if method == "Network.requestWillBeSent":
+            # redirects reuse the requestId; keep the final hop
+            requests[rid] = {"url": params["request"]["url"], "type": params.get("type", ""),
+                             "start": params.get("timestamp"), "nav": pages["nav"],
+                             "render_blocking": params["request"].get("renderBlockingBehavior") == "Blocking"}
+        elif rid not in requests:
+            continue
+        elif method == "Network.responseReceived":
+            resp = params.get("response", {})
+            requests[rid].update(status=resp.get("status"), timing=resp.get("timing"),
+                                 type=params.get("type", requests[rid]["type"]),
+                                 bytes=resp.get("encodedDataLength"))
+        elif method == "Network.loadingFinished":
+            requests[rid].update(end=params.get("timestamp"), bytes=params.get("encodedDataLength"))
+        elif method == "Network.loadingFailed":
+            requests[rid].update(end=params.get("timestamp"), status=f"failed: {params.get('errorText', '')}")
+
+
+def finished(request):
+    return request.get("end") is not None
+
+
+def to_row(r, pages=None):
+    """One request record reduced to the HAR-style output row."""
+    # compared with the DOMContentLoaded of the page the request was made for
+    dom_content_loaded = (pages or new_pages())["dcl"].get(r.get("nav"))
+    timing = r.get("timing")
+    ttfb = _span(timing, "sendEnd", "receiveHeadersEnd")
+    download = None
+    if timing and r.get("end") is not None and timing.get("receiveHeadersEnd", -1) >= 0:
+        headers_at = timing["requestTime"] + timing["receiveHeadersEnd"] / 1000.0
+        download = _ms((r["end"] - headers_at) * 1000.0)
+    total = None
+    if r.get("start") is not None and r.get("end") is not None:
+        total = _ms((r["end"] - r["start"]) * 1000.0)
+    blocking = r["render_blocking"] or (
+        r["type"] in BLOCKING_TYPES and dom_content_loaded is not None
+        and r.get("start") is not None and r["start"] < dom_content_loaded)
+    return {
+        "url": r["url"], "host": urlsplit(r["url"]).hostname or "", "type": r["type"],
+        "status": r.get("status"),
+        "dns": _span(timing, "dnsStart", "dnsEnd"),
+        "connect": _span(timing, "connectStart", "connectEnd"),
+        "ssl": _span(timing, "sslStart", "sslEnd"),
+        "ttfb": ttfb, "download": download, "total": total,
+        "bytes": r.get("bytes") or 0, "blocking": bool(blocking),
+    }
+
+
+def summarize(entries):
+    """
+    Reduce raw performance log entries (driver.get_log("performance")) to one
+    dict per request. Times are in milliseconds, None when not applicable
+    (e.g. no DNS lookup on a reused connection, or a request still in flight).
+    """
+    requests, pages = {}, new_pages()
+    collect(entries, requests, pages)
+    return [to_row(r, pages) for r in requests.values()]
+
+
+class NetCapture:
+    """
+    Drains the performance log of one municipality attempt at every navigation
+    step. Requests still in flight at a step are kept until a later drain sees
+    them finish; flush() writes whatever is left when the attempt ends.
+    """
+
+    _lock = threading.Lock()
+
+    def __init__(self, idx, attempt, out_dir=NETWORK_DIR):
+        self.idx = idx
+        self.attempt = attempt
+        self.path = os.path.join(out_dir, REQUESTS_FILE)
+        self._requests = {}
+        self._pages = new_pages()
+
+    def snapshot(self, driver, step):
+        # get_log() returns (and clears) everything buffered since the last call,
+        # so requests made while clicking through pages land in the next step
+        self._drain(driver, step)
+        done = [rid for rid, r in self._requests.items() if finished(r)]
+        self._write([self._requests.pop(rid) for rid in done])
+
+    def flush(self, driver, step="end"):
+        """Drain the log one last time (before the driver quits) and write every request left."""
+        try:
+            self._drain(driver, step)
+        finally:
+            rows, self._requests = list(self._requests.values()), {}
+            self._write(rows)
+
+    def _drain(self, driver, step):
+        before = set(self._requests)
+        collect(driver.get_log("performance"), self._requests, self._pages)
+        for rid, r in self._requests.items():
+            if rid not in before or "step" not in r:
+                r["step"] = step
+
+    def _write(self, requests):
+        if not requests:
+            return
+        lines = []
+        for r in requests:
+            row = dict(to_row(r, self._pages), idx=self.idx, attempt=self.attempt, step=r["step"])
+            lines.append(json.dumps(row, ensure_ascii=False, separators=(",", ":")))
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+
+
+def load(path=None):
+    path = path or os.path.join(NETWORK_DIR, REQUESTS_FILE)
+    rows = []
+    if not os.path.exists(path):
+        return rows
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                rows.append(json.loads(line))
+    return rows
+
+
+def category(row):
+    """votemanager / static (scripts, styles, images, fonts) / municipal (other hosts)."""
+    if "votemanager" in row.get("host", ""):
+        return "votemanager"
+    if row.get("type") in STATIC_TYPES:
+        return "static"
+    return "municipal"
+
+
+def _p95(values):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * 0.95))]
+
+
+def _stats(rows):
+    totals = [r["total"] for r in rows if r.get("total") is not None]
+    ttfbs = [r["ttfb"] for r in rows if r.get("ttfb") is not None]
+    return {
+        "requests": len(rows),
+        "failed": sum(1 for r in rows if str(r.get("status", "")).startswith("failed")),
+        "bytes": sum(r.get("bytes") or 0 for r in rows),
+        "time_ms": sum(totals),
+        "p95_ms": _p95(totals),
+        "ttfb_p95_ms": _p95(ttfbs),
+    }
+
+
+def report(path=None, top=20):
+    rows = load(path)
+    if not rows:
+        print("No network capture found (run scrape with --capture-network)")
+        return None
+
+    print(f"{len(rows)} requests over {len({(r['idx'], r['attempt']) for r in rows})} municipality attempts")
+    print("\nBy origin:")
+    by_cat = defaultdict(list)
+    for r in rows:
+        by_cat[category(r)].append(r)
+    for cat, grp in sorted(by_cat.items(), key=lambda kv: -_stats(kv[1])["time_ms"]):
+        s = _stats(grp)
+        print(f"  {cat:12} requests={s['requests']:6} time={s['time_ms'] / 1000:9.1f}s "
+              f"p95={s['p95_ms']:8.0f}ms ttfb_p95={s['ttfb_p95_ms']:8.0f}ms "
+              f"MB={s['bytes'] / 1e6:7.1f} failed={s['failed']}")
+
+    by_host = defaultdict(list)
+    by_resource = defaultdict(list)
+    for r in rows:
+        by_host[r["host"]].append(r)
+        by_resource[r["url"].split("?")[0]].append(r)
+    hosts = sorted(((h, _stats(g)) for h, g in by_host.items()), key=lambda kv: -kv[1]["time_ms"])
+    print(f"\nSlowest hosts (total request time), top {top}:")
+    for host, s in hosts[:top]:
+        print(f"  {s['time_ms'] / 1000:9.1f}s  p95={s['p95_ms']:7.0f}ms  ttfb_p95={s['ttfb_p95_ms']:7.0f}ms  "
+              f"n={s['requests']:5}  failed={s['failed']:3}  {host}")
+
+    resources = sorted(((u, _stats(g)) for u, g in by_resource.items()), key=lambda kv: -kv[1]["time_ms"])
+    print(f"\nSlowest resources (total request time), top {top}:")
+    for url, s in resources[:top]:
+        print(f"  {s['time_ms'] / 1000:9.1f}s  n={s['requests']:5}  KB={s['bytes'] / 1e3:8.0f}  {url}")
+
+    blocking = [r for r in rows if r.get("blocking")]
+    blocking_by_url = defaultdict(list)
+    for r in blocking:
+        blocking_by_url[r["url"].split("?")[0]].append(r)
+    ranked = sorted(((u, _stats(g)) for u, g in blocking_by_url.items()), key=lambda kv: -kv[1]["time_ms"])
+    print(f"\nRender-blocking resources ({len(blocking)} requests), top {top}:")
+    for url, s in ranked[:top]:
+        print(f"  {s['time_ms'] / 1000:9.1f}s  n={s['requests']:5}  KB={s['bytes'] / 1e3:8.0f}  {url}")
+    return {"hosts": hosts, "resources": resources, "blocking": ranked}
+
+
+def main():
+    report()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+# Record-and-replay page archive for scrape_single_muni.
+#
+# Record mode: every navigation step of a municipality attempt is saved
+# (URL, document headers, rendered HTML, timestamp) as a zlib-compressed
+# record appended to <archive>/pages.dat, with one JSON line per record in
+# <archive>/index.jsonl (offset/length into pages.dat). Append-only, so a
+# crashed run still leaves a readable archive.
+#
+# Replay mode: ReplayDriver implements the small part of the selenium
+# WebDriver API that the scraper uses on top of the archived HTML (lxml),
+# so the navigation/extraction logic runs unchanged without network or
+# browser. get() and link clicks advance to the next recorded page of the
+# attempt; clicks on in-page controls (href="#", dropdowns, pagination) do
+# not navigate.
+import json
+import os
+import re
+import threading
+import time
+import uuid
+import zlib
+from urllib.parse import urljoin
+
+INDEX_NAME = "index.jsonl"
+DATA_NAME = "pages.dat"
+
+# document properties we can read back from a live page; selenium does not
+# expose the HTTP response headers themselves
+_HEADERS_JS = """
+return {
+    "content-type": document.contentType,
+    "charset": document.characterSet,
+    "last-modified": document.lastModified,
+    "referrer": document.referrer
+};
+"""
+
+
+class PageArchive:
+    def __init__(self, path):
+        self.path = path
+        self.index_path = os.path.join(path, INDEX_NAME)
+        self.data_path = os.path.join(path, DATA_NAME)
+        self._index = None
+        self._lock = threading.Lock()
+
+    # --- recording -------------------------------------------------------
+
+    def recorder(self, idx, attempt):
+        return Recorder(self, idx, attempt)
+
+    def append(self, entry, snapshot):
+        """Append one compressed page record and its index line."""
+        blob = zlib.compress(json.dumps(snapshot, ensure_ascii=False).encode("utf-8"), 6)
+        # offsets must stay consistent when several workers record at once
+        with self._lock:
+            os.makedirs(self.path, exist_ok=True)
+            with open(self.data_path, "ab") as f:
+                f.seek(0, os.SEEK_END)
+                offset = f.tell()
+                f.write(blob)
+            entry = dict(entry, offset=offset, length=len(blob))
+            with open(self.index_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._index = None
+
+    # --- replay ----------------------------------------------------------
+
+    def load_index(self):
+        """
+        idx -> attempt -> ordered list of index entries.
+        When a municipality was recorded several times only the latest take of
+        each attempt is kept.
+        """
+        if self._index is not None:
+            return self._index
+        takes = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path, encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    e = json.loads(line)
+                    key = (e["idx"], e["attempt"])
+                    cur = takes.get(key)
+                    if cur is None or cur[0] != e["take"]:
+                        # later lines win: a new take replaces the older one
+                        takes[key] = (e["take"], [])
+                    takes[key][1].append(e)
+        index = {}
+        for (idx, attempt), (_, entries) in takes.items():
+            index.setdefault(idx, {})[attempt] = sorted(entries, key=lambda e: e["seq"])
+        self._index = index
+        return index
+
+    def recorded_indices(self):
+        return sorted(self.load_index())
+
+    def read(self, entry):
+        with open(self.data_path, "rb") as f:
+            f.seek(entry["offset"])
+            blob = f.read(entry["length"])
+        return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+    def replay_driver(self, idx, attempt):
+        """Driver serving attempt `attempt` of municipality `idx` (or its last recorded attempt)."""
+        attempts = self.load_index().get(idx)
+        if not attempts:
+            pages = []
+        elif attempt in attempts:
+            pages = attempts[attempt]
+        else:
+            pages = attempts[max(attempts)]
+        return ReplayDriver(self, pages)
+
+
+class Recorder:
+    """Snapshots the pages of one municipality attempt into a PageArchive."""
+
+    def __init__(self, archive, idx, attempt):
+        self.archive = archive
+        self.idx = idx
+        self.attempt = attempt
+        self.take = uuid.uuid4().hex
+        self.seq = 0
+
+    def snapshot(self, driver, step):
+        try:
+            headers = driver.execute_script(_HEADERS_JS) or {}
+        except Exception:
+            headers = {}
+        url = driver.current_url
+        entry = {"idx": self.idx, "attempt": self.attempt, "take": self.take, "seq": self.seq,
+                 "step": step, "url": url, "ts": time.time()}
+        self.archive.append(entry, {"url": url, "headers": headers, "body": driver.page_source,
+                                    "ts": entry["ts"]})
+        self.seq += 1
+
+
+# ---------------------------------------------------------------------------
+# Replay driver
+
+def _selenium_errors():
+    from selenium.common.exceptions import NoSuchElementException, WebDriverException
+    return NoSuchElementException, WebDriverException
+
+
+def _is_navigation(el):
+    href = (el.get("href") or "").strip()
+    if href and not href.startswith("#") and not href.lower().startswith("javascript:"):
+        return True
+    return bool(el.get("onclick"))
+
+
+def _select(node, by, value):
+    if by == "xpath":
+        found = node.xpath(value)
+    elif by == "css selector":
+        found = node.cssselect(value)
+    elif by == "tag name":
+        found = node.xpath(f".//{value}")
+    elif by == "id":
+        found = node.xpath(".//*[@id=$v]", v=value)
+    elif by == "name":
+        found = node.xpath(".//*[@name=$v]", v=value)
+    elif by == "class name":
+        found = node.xpath(".//*[contains(concat(' ', normalize-space(@class), ' '), $v)]", v=f" {value} ")
+    elif by == "link text":
+        found = [a for a in node.xpath(".//a") if _text(a) == value]
+    elif by == "partial link text":
+        found = [a for a in node.xpath(".//a") if value in _text(a)]
+    else:
+        raise ValueError(f"replay: unsupported locator strategy {by!r}")
+    # xpath() may also return strings/attributes; only elements are findable
+    return [el for el in found if hasattr(el, "tag")]
+
+
+def _text(el):
+    return " ".join(el.text_content().split())
+
+
+class ReplayElement:
+    def __init__(self, driver, el):
+        self._driver = driver
+        self._el = el
+
+    @property
+    def text(self):
+        return _text(self._el)
+
+    @property
+    def tag_name(self):
+        return self._el.tag
+
+    def get_attribute(self, name):
+        value = self._el.get(name)
+        if value is not None and name in ("href", "src"):
+            # selenium returns the resolved URL for link properties
+            return urljoin(self._driver.current_url, value)
+        return value
+
+    def find_element(self, by, value):
+        return self._driver._first(self._el, by, value)
+
+    def find_elements(self, by, value):
+        return [ReplayElement(self._driver, e) for e in _select(self._el, by, value)]
+
+    def is_displayed(self):
+        return True
+
+    def is_enabled(self):
+        return True
+
+    def click(self):
+        self._driver._click(self._el)
+
+
+class ReplayDriver:
+    """Minimal stand-in for selenium's WebDriver that serves recorded pages."""
+
+    is_replay = True
+
+    def __init__(self, archive, pages):
+        self._archive = archive
+        self._pages = pages
+        self._cursor = -1
+        self._doc = None
+        self.current_url = "about:blank"
+        self.step = None
+
+    def _goto(self, pos):
+        _, WebDriverException = _selenium_errors()
+        if pos >= len(self._pages):
+            raise WebDriverException(f"replay: no recorded page after {self.current_url}")
+        import lxml.html
+        snap = self._archive.read(self._pages[pos])
+        self._cursor = pos
+        self._doc = lxml.html.document_fromstring(snap["body"] or "<html></html>")
+        self.current_url = snap["url"]
+        self.step = self._pages[pos]["step"]
+
+    def _first(self, node, by, value):
+        NoSuchElementException, _ = _selenium_errors()
+        if node is None:
+            raise NoSuchElementException(f"replay: no page loaded ({by}={value})")
+        found = _select(node, by, value)
+        if not found:
+            raise NoSuchElementException(f"replay: {by}={value} not found on {self.current_url}")
+        return ReplayElement(self, found[0])
+
+    def _click(self, el):
+        if _is_navigation(el):
+            self._goto(self._cursor + 1)
+
+    # --- WebDriver API used by the scraper --------------------------------
+
+    def get(self, url):
+        self._goto(self._cursor + 1)
+
+    def find_element(self, by, value):
+        return self._first(self._doc, by, value)
+
+    def find_elements(self, by, value):
+        if self._doc is None:
+            return []
+        return [ReplayElement(self, e) for e in _select(self._doc, by, value)]
+
+    def execute_script(self, script, *args):
+        if ".click()" in script:
+            if args and isinstance(args[0], ReplayElement):
+                self._click(args[0]._el)
+            else:
+                m = re.search(r"querySelector\('(.+?)'\)", script)
+                if m and self._doc is not None:
+                    found = _select(self._doc, "css selector", m.group(1))
+                    if found:
+                        self._click(found[0])
+            return None
+        if script.strip() == "return 1":
+            return 1
+        # scrollIntoView and other cosmetic scripts are no-ops
+        return None
+
+    @property
+    def page_source(self):
+        import lxml.html
+        return lxml.html.tostring(self._doc, encoding="unicode") if self._doc is not None else ""
+
+    @property
+    def title(self):
+        return (self._doc.findtext(".//title") or "").strip() if self._doc is not None else ""
+
+    def set_page_load_timeout(self, seconds):
+        pass
+
+    def quit(self):
+        self._doc = None
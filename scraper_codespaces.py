@@ -4,7 +4,6 @@
 import os
 import time
 import csv
-from tqdm import tqdm
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
@@ -17,9 +16,200 @@ import subprocess
 import signal
 import glob
 import traceback
-from webdriver_manager.chrome import ChromeDriverManager
+import contextlib
+import re
 from selenium.webdriver.chrome.service import Service
 import concurrent.futures
+import throttle
+
+MAIN_URL = "https://wahlen.votemanager.de/"
+# Default range for main(); the CLI (cli.py) takes --range instead
+DEFAULT_RANGE = (2975, 3000)
+LISTING_ROWS_XPATH = "/html/body/div[3]/div/div/div/div/table/tbody/tr"
+NEXT_PAGE_SELECTORS = [
+    "#ergebnisTabelle_next > a",
+    "#ergebnisTabelle_next a",
+    "a[aria-label='Next']",
+    ".paginate_button.next a",
+    ".page-item.next a"
+]
+
+# Output locations (relative to the working directory)
+LOG_FILE = DEFAULT_LOG_FILE = "scraped_munis.log"
+DATA_LINKS_DIR = DEFAULT_DATA_LINKS_DIR = "2021/data_links"
+MUNICIPALITIES_CSV = "municipality_names_with_page.csv"
+# Per-host AIMD limits (throttle.py), rewritten while a run is in progress
+THROTTLE_METRICS = "2021/summary_stats/throttle_metrics.json"
+# /tmp/chrome_profile_* dirs older than this are left over from crashed runs
+STALE_PROFILE_AGE = 3600
+# titles of HTTP error pages served instead of the requested page: a status
+# code at the start ("503 Service Unavailable", "Error 429", "HTTP 502") or
+# one of the standard reason phrases
+ERROR_PAGE_STATUS = re.compile(r"^\s*(?:http(?: error)?|error)?\s*(?:429|5\d\d)\b", re.IGNORECASE)
+ERROR_PAGE_TITLES = ("too many requests", "bad gateway", "service unavailable", "internal server error",
+                     "gateway timeout", "gateway time-out")
+
+# Record/replay page archive (see page_cache.py).
+# SCRAPER_PAGE_MODE=record saves every page visited by scrape_single_muni to
+# SCRAPER_PAGE_ARCHIVE; SCRAPER_PAGE_MODE=replay serves them back without
+# network or browser (log and data_links then go inside the archive folder).
+PAGE_MODE = ""
+PAGE_ARCHIVE_DIR = "2021/page_archive"
+_page_archive = None
+
+def configure_page_archive(mode, path=PAGE_ARCHIVE_DIR):
+    global PAGE_MODE, PAGE_ARCHIVE_DIR, LOG_FILE, DATA_LINKS_DIR, _page_archive
+    mode = (mode or "").lower()
+    if mode not in ("", "record", "replay"):
+        raise ValueError(f"Unknown page archive mode: {mode}")
+    PAGE_MODE = mode
+    PAGE_ARCHIVE_DIR = path
+    _page_archive = None
+    if mode:
+        import page_cache
+        _page_archive = page_cache.PageArchive(path)
+    if mode == "replay":
+        LOG_FILE = os.path.join(path, "replay.log")
+        DATA_LINKS_DIR = os.path.join(path, "data_links")
+    else:
+        LOG_FILE = DEFAULT_LOG_FILE
+        DATA_LINKS_DIR = DEFAULT_DATA_LINKS_DIR
+
+configure_page_archive(os.environ.get("SCRAPER_PAGE_MODE"),
+                       os.environ.get("SCRAPER_PAGE_ARCHIVE", PAGE_ARCHIVE_DIR))
+
+# Opt-in DevTools network timing capture (see netcapture.py), SCRAPER_NETWORK_CAPTURE=1
+NETWORK_CAPTURE = False
+NETWORK_DIR = None
+
+def configure_network_capture(enabled, out_dir=None):
+    global NETWORK_CAPTURE, NETWORK_DIR
+    NETWORK_CAPTURE = bool(enabled)
+    NETWORK_DIR = out_dir
+
+configure_network_capture(os.environ.get("SCRAPER_NETWORK_CAPTURE", "") not in ("", "0"),
+                          os.environ.get("SCRAPER_NETWORK_DIR"))
+
+# Tabs backend (see tabs.py): every attempt gets a tab/browser context in one
+# shared Chrome instead of its own Chrome process
+_tab_pool = None
+
+def configure_tab_pool(enabled, isolated=True):
+    global _tab_pool
+    shutdown_tab_pool()
+    if enabled:
+        import tabs
+        _tab_pool = tabs.TabPool(lambda: get_chrome_driver(page_load_strategy="none"), isolated=isolated)
+
+def shutdown_tab_pool():
+    if _tab_pool is not None:
+        _tab_pool.shutdown()
+
+def _is_replay(driver):
+    return getattr(driver, "is_replay", False)
+
+def _wait(driver, timeout):
+    # recorded pages never change, so a single lookup is as good as waiting
+    if _is_replay(driver):
+        return WebDriverWait(driver, 0, poll_frequency=0.001)
+    return WebDriverWait(driver, timeout)
+
+def _pause(driver, seconds):
+    if not _is_replay(driver):
+        time.sleep(seconds)
+
+def _new_driver(idx, attempt):
+    """Live Chrome driver, or a driver serving the recorded pages in replay mode."""
+    if PAGE_MODE == "replay":
+        return _page_archive.replay_driver(idx, attempt), None
+    if _tab_pool is not None:
+        return _tab_pool.open_tab(), None
+    return get_chrome_driver()
+
+def _observers(driver, idx, attempt):
+    """Per-attempt page recorder / network capture, each with snapshot(driver, step)."""
+    observers = []
+    if PAGE_MODE == "record":
+        observers.append(_page_archive.recorder(idx, attempt))
+    if NETWORK_CAPTURE and not _is_replay(driver):
+        import netcapture
+        observers.append(netcapture.NetCapture(idx, attempt, NETWORK_DIR or netcapture.NETWORK_DIR))
+    return observers
+
+def replayable(muni_indices):
+    """In replay mode, only the municipality numbers present in the archive."""
+    if PAGE_MODE != "replay":
+        return list(muni_indices)
+    recorded = set(_page_archive.recorded_indices())
+    kept = [i for i in muni_indices if i in recorded]
+    if len(kept) < len(muni_indices):
+        print(f"{len(muni_indices) - len(kept)} municipalities are not in the page archive, skipping them")
+    return kept
+
+def _host_slot(driver, url):
+    """Per-host throttle slot for a navigation to `url` (none when replaying)."""
+    if _is_replay(driver):
+        return contextlib.nullcontext(throttle.Slot())
+    return throttle.THROTTLE.slot(url)
+
+def _check_error_page(driver, slot):
+    """Report a 429/5xx error page served instead of the requested one to the throttle."""
+    if _is_replay(driver):
+        return
+    title = driver.title or ""
+    if ERROR_PAGE_STATUS.match(title) or any(m in title.lower() for m in ERROR_PAGE_TITLES):
+        slot.fail(f"error page: {title}")
+
+def _navigate(driver, url):
+    with _host_slot(driver, url) as slot:
+        driver.get(url)
+        _check_error_page(driver, slot)
+
+def _write_throttle_metrics():
+    if PAGE_MODE == "replay" or not throttle.THROTTLE.enabled:
+        return
+    try:
+        throttle.THROTTLE.write_metrics(THROTTLE_METRICS)
+    except Exception as e:
+        print(f"Could not write throttle metrics: {e}")
+
+def _checkpoint(observers, driver, step):
+    for observer in observers:
+        try:
+            observer.snapshot(driver, step)
+        except Exception as e:
+            print(f"Could not record page '{step}' ({type(observer).__name__}): {e}")
+
+def _end_attempt(observers, driver, profile_dir):
+    """Quit the attempt's driver; network capture drains the log first so failed attempts are kept too."""
+    for observer in observers:
+        if hasattr(observer, "flush"):
+            try:
+                observer.flush(driver)
+            except Exception as e:
+                print(f"Could not flush {type(observer).__name__}: {e}")
+    safe_quit(driver, profile_dir)
+
+def _click_next_page(driver):
+    """Click the listing's 'weiter' button; returns False if no selector matched."""
+    for selector in NEXT_PAGE_SELECTORS:
+        try:
+            _wait(driver, 3).until(
+                EC.element_to_be_clickable((By.CSS_SELECTOR, selector))
+            )
+
+            driver.execute_script(f"""
+                var btn = document.querySelector('{selector}');
+                if (btn) {{ 
+                    btn.scrollIntoView(true);
+                    btn.click();
+                }}
+            """)
+            return True
+
+        except Exception:
+            continue
+    return False
 
 def safe_quit(driver, profile_dir):
     try:
@@ -33,22 +223,34 @@ def safe_quit(driver, profile_dir):
             except Exception:
                 pass
 
-def _kill_existing_chrome_processes():
-    """Intenta terminar procesos chromedriver / chrome huérfanos que puedan bloquear perfiles."""
+def _kill_driver_processes(service=None, user_data_dir=None):
+    """
+    Termina solo los procesos de este driver: su chromedriver (service.process) y
+    los procesos de Chrome lanzados con su user_data_dir. Otros workers siguen vivos.
+    """
+    process = getattr(service, "process", None)
+    if process is not None:
+        try:
+            process.kill()
+        except Exception:
+            pass
+    if not user_data_dir:
+        return
+    marker = f"--user-data-dir={user_data_dir}"
     try:
-        out = subprocess.check_output(["ps", "aux"], text=True)
-        for line in out.splitlines():
-            if ("chromedriver" in line or "chrome" in line or "chromium" in line) and "grep" not in line:
-                parts = line.split()
-                if len(parts) >= 2:
-                    try:
-                        pid = int(parts[1])
-                        os.kill(pid, signal.SIGTERM)
-                    except Exception:
-                        # ignore failures (process may have exited)
-                        pass
+        out = subprocess.check_output(["ps", "-eo", "pid=,args="], text=True)
     except Exception:
-        pass
+        return
+    for line in out.splitlines():
+        pid, _, args = line.strip().partition(" ")
+        if marker not in args.split():
+            continue
+        try:
+            if int(pid) != os.getpid():
+                os.kill(int(pid), signal.SIGTERM)
+        except Exception:
+            # ignore failures (process may have exited)
+            pass
 
 def _find_chrome_binary():
     """Detecta un binario de Chrome/Chromium disponible en el contenedor."""
@@ -85,7 +287,7 @@ def _find_chrome_binary():
                 print(f"Skipping non-runnable Chrome candidate in PATH: {p}")
     return None
 
-def _cleanup_stale_profiles(max_age_seconds=600):
+def _cleanup_stale_profiles(max_age_seconds=STALE_PROFILE_AGE):
     """Remove stale chrome profile dirs in /tmp older than max_age_seconds."""
     now = time.time()
     patterns = ["/tmp/chrome_profile_*", "/tmp/*chrome_user_data*", "/tmp/*hrome_profile_*"]
@@ -100,14 +302,11 @@ def _cleanup_stale_profiles(max_age_seconds=600):
             except Exception:
                 pass
 
-def get_chrome_driver():
+def get_chrome_driver(page_load_strategy=None):
     """Chrome driver setup: unique user-data-dir + webdriver-manager + process cleanup + retries"""
     max_attempts = 3
     last_exc = None
 
-    # Remove old temporary profiles immediately to avoid collisions
-    _cleanup_stale_profiles(0)
-
     chrome_bin = _find_chrome_binary()
     if not chrome_bin:
         print("Warning: no Chrome/Chromium binary found in expected locations. Install chromium-browser or google-chrome.")
@@ -140,11 +339,17 @@ def get_chrome_driver():
         options.add_argument("--disable-features=VizDisplayCompositor")
         options.add_argument("--disable-software-rasterizer")
         options.add_argument("--use-gl=swiftshader")
+        if NETWORK_CAPTURE:
+            import netcapture
+            netcapture.enable(options)
+        if page_load_strategy:
+            options.page_load_strategy = page_load_strategy
 
         if chrome_bin:
             options.binary_location = chrome_bin
 
         print(f"[get_chrome_driver] attempt={attempt} user_data_dir={user_data_dir} chrome_bin={chrome_bin}")
+        service = None
         try:
             # If CHROME_REMOTE_URL is set, try connecting to a remote chromedriver server
             remote_url = os.environ.get("CHROME_REMOTE_URL") or os.environ.get("CHROMEDRIVER_REMOTE_URL")
@@ -162,12 +367,12 @@ def get_chrome_driver():
                         shutil.rmtree(user_data_dir, ignore_errors=True)
                     except Exception:
                         pass
-                    _kill_existing_chrome_processes()
                     time.sleep(1)
                     continue
 
             # Use webdriver-manager to ensure matching chromedriver
             # but the returned path may contain unexpected newlines in this env.
+            from webdriver_manager.chrome import ChromeDriverManager
             wdm_path = ChromeDriverManager().install()
             # try to find the chromedriver executable under the parent folder using glob
             import glob
@@ -205,15 +410,16 @@ def get_chrome_driver():
             # Log brief error to help debugging
             print(f"get_chrome_driver attempt {attempt} failed: {e}")
             traceback.print_exc()
+            # Stop the chromedriver/Chrome of this attempt only; other workers'
+            # browsers (and this process) must survive a failed start
+            _kill_driver_processes(service, user_data_dir)
+
             # Clean up temp profile from failed attempt
             try:
                 shutil.rmtree(user_data_dir, ignore_errors=True)
             except Exception:
                 pass
 
-            # Try to kill any leftover chrome/chromedriver processes that may hold locks
-            _kill_existing_chrome_processes()
-
             # small backoff before retry
             time.sleep(1)
 
@@ -227,18 +433,19 @@ def scrape_single_muni(idx):
     while attempt < max_attempts:
         driver = None
         profile_dir = None
+        observers = []
         
         # Log start of attempt
-        with open("scraped_munis.log", "a") as logf:
+        with open(LOG_FILE, "a") as logf:
             logf.write(f"{idx},started,attempt_{attempt}\n")
         
         try:
             # Create driver instance
-            driver, profile_dir = get_chrome_driver()
+            driver, profile_dir = _new_driver(idx, attempt)
+            observers = _observers(driver, idx, attempt)
             print(f"\n--- Processing municipality #{idx} ---")
 
-            main_url = "https://wahlen.votemanager.de/"
-            driver.get(main_url)
+            _navigate(driver, MAIN_URL)
 
             page_num = (idx - 1) // 10 + 1
             row_on_page = ((idx - 1) % 10) + 1
@@ -248,53 +455,26 @@ def scrape_single_muni(idx):
                 try:
                     # Iterate pages silently (no progress bar)
                     for i in range(page_num - 1):
-                        time.sleep(0.3)
-
-                        clicked = False
-                        selectors = [
-                            "#ergebnisTabelle_next > a",
-                            "#ergebnisTabelle_next a",
-                            "a[aria-label='Next']",
-                            ".paginate_button.next a",
-                            ".page-item.next a"
-                        ]
-
-                        for selector in selectors:
-                            try:
-                                WebDriverWait(driver, 3).until(
-                                    EC.element_to_be_clickable((By.CSS_SELECTOR, selector))
-                                )
-
-                                driver.execute_script(f"""
-                                    var btn = document.querySelector('{selector}');
-                                    if (btn) {{ 
-                                        btn.scrollIntoView(true);
-                                        btn.click();
-                                    }}
-                                """)
-
-                                clicked = True
-                                break
-
-                            except Exception:
-                                continue
-
-                        if not clicked:
+                        _pause(driver, 0.3)
+
+                        if not _click_next_page(driver):
                             raise Exception("Could not click weiter button with any selector")
 
-                        time.sleep(0.3)
+                        _pause(driver, 0.3)
 
                 except Exception as e:
                     print(f"Error clicking 'weiter' button for municipality #{idx}: {e}")
                     if driver:
-                        driver.quit()
+                        _end_attempt(observers, driver, profile_dir)
                     attempt += 1
                     continue
 
+            _checkpoint(observers, driver, "listing")
+
             # Find municipality row and check Bundesland
             try:
-                muni_row = WebDriverWait(driver, 5).until(
-                    EC.presence_of_element_located((By.XPATH, f"/html/body/div[3]/div/div/div/div/table/tbody/tr[{row_on_page}]"))
+                muni_row = _wait(driver, 5).until(
+                    EC.presence_of_element_located((By.XPATH, f"{LISTING_ROWS_XPATH}[{row_on_page}]"))
                 )
                 
                 # Check if Bayern (skip if so)
@@ -303,10 +483,10 @@ def scrape_single_muni(idx):
                 
                 if bundesland == "Bayern":
                     print(f"Municipality #{idx} is in Bayern - skipping (no data available)")
-                    with open("scraped_munis.log", "a") as logf:
+                    with open(LOG_FILE, "a") as logf:
                         logf.write(f"{idx},bayern_skip\n")
                     if driver:
-                        safe_quit(driver, profile_dir)
+                        _end_attempt(observers, driver, profile_dir)
                     attempt = max_attempts
                     continue
                 
@@ -319,26 +499,28 @@ def scrape_single_muni(idx):
             except Exception as e:
                 print(f"Could not find municipality link for #{idx}: {e}")
                 if driver:
-                    safe_quit(driver, profile_dir)
+                    _end_attempt(observers, driver, profile_dir)
                 attempt += 1
                 continue
 
             # Go to municipality page
-            driver.get(muni_url)
+            _navigate(driver, muni_url)
 
             # Find Bundestagswahl 2021
             try:
-                WebDriverWait(driver, 7).until(
+                _wait(driver, 7).until(
                     EC.presence_of_element_located((By.XPATH, "//td[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'bundestag') or contains(text(), '2021')]"))
                 )
+                _checkpoint(observers, driver, "muni")
                 table = driver.find_element(By.XPATH, "/html/body/div/div[2]/table/tbody")
                 rows = table.find_elements(By.TAG_NAME, "tr")
             except Exception:
+                _checkpoint(observers, driver, "muni")
                 print(f"No Bundestagswahl or 2021 election found for municipality #{idx}, skipping.")
-                with open("scraped_munis.log", "a") as logf:
+                with open(LOG_FILE, "a") as logf:
                     logf.write(f"{idx},no_bundestagswahl\n")
                 if driver:
-                    safe_quit(driver, profile_dir)
+                    _end_attempt(observers, driver, profile_dir)
                 attempt = max_attempts
                 continue
 
@@ -367,16 +549,19 @@ def scrape_single_muni(idx):
             if not found:
                 print(f"Bundestagswahl 2021 link not found for municipality #{idx}")
                 if driver:
-                    safe_quit(driver, profile_dir)
+                    _end_attempt(observers, driver, profile_dir)
                 attempt += 1
                 continue
 
             # Click election link
             try:
                 driver.execute_script("arguments[0].scrollIntoView(true);", election_link)
-                time.sleep(1)
-                driver.execute_script("arguments[0].click();", election_link)
-                WebDriverWait(driver, 10).until(EC.url_changes(muni_url))
+                _pause(driver, 1)
+                with _host_slot(driver, muni_url) as slot:
+                    driver.execute_script("arguments[0].click();", election_link)
+                    _wait(driver, 10).until(EC.url_changes(muni_url))
+                    _check_error_page(driver, slot)
+                _checkpoint(observers, driver, "election")
             except UnexpectedAlertPresentException:
                 try:
                     alert = driver.switch_to.alert
@@ -385,48 +570,51 @@ def scrape_single_muni(idx):
                     pass
                 print("pop up window. election not available")
                 if driver:
-                    safe_quit(driver, profile_dir)
+                    _end_attempt(observers, driver, profile_dir)
                 attempt += 1
                 continue
             except Exception as e:
                 print(f"Error after clicking election link: {e}")
                 if driver:
-                    safe_quit(driver, profile_dir)
+                    _end_attempt(observers, driver, profile_dir)
                 attempt += 1
                 continue
 
             # Click 'mehr ...' link
             try:
-                mehr_link = WebDriverWait(driver, 10).until(
+                mehr_link = _wait(driver, 10).until(
                     EC.element_to_be_clickable((By.PARTIAL_LINK_TEXT, "mehr"))
                 )
                 driver.execute_script("arguments[0].scrollIntoView(true);", mehr_link)
-                time.sleep(0.5)
-                driver.execute_script("arguments[0].click();", mehr_link)
+                _pause(driver, 0.5)
             except TimeoutException:
                 print("Timeout: 'mehr ...' link not found, skipping municipality.")
                 if driver:
-                    safe_quit(driver, profile_dir)
+                    _end_attempt(observers, driver, profile_dir)
                 attempt += 1
                 continue
             except Exception as e:
                 print(f"Error finding/clicking 'mehr ...' link: {e}")
                 if driver:
-                    safe_quit(driver, profile_dir)
+                    _end_attempt(observers, driver, profile_dir)
                 attempt += 1
                 continue
 
-            # Wait for results page
-            WebDriverWait(driver, 10).until(EC.url_contains("ergebnis.html"))
+            # Click it and wait for results page (the slot covers the whole navigation)
+            with _host_slot(driver, driver.current_url) as slot:
+                driver.execute_script("arguments[0].click();", mehr_link)
+                _wait(driver, 10).until(EC.url_contains("ergebnis.html"))
+                _check_error_page(driver, slot)
+            _checkpoint(observers, driver, "ergebnis")
 
             # Click 'weitere' dropdown
             try:
-                weitere_dropdown = WebDriverWait(driver, 5).until(
+                weitere_dropdown = _wait(driver, 5).until(
                     EC.element_to_be_clickable((By.XPATH, "//a[contains(@class, 'dropdown-toggle') and contains(text(), 'weitere')]"))
                 )
                 driver.execute_script("arguments[0].scrollIntoView(true);", weitere_dropdown)
                 weitere_dropdown.click()
-                time.sleep(0.5)
+                _pause(driver, 0.5)
             except Exception:
                 print("Dropdown click done.")
 
@@ -434,20 +622,23 @@ def scrape_single_muni(idx):
             try:
                 opendata_link = driver.find_element(By.XPATH, "//a[contains(@class, 'dropdown-item') and contains(., 'Open Data')]")
                 driver.execute_script("arguments[0].scrollIntoView(true);", opendata_link)
-                driver.execute_script("arguments[0].click();", opendata_link)
             except Exception:
                 print("Empty page error. No data available")
-                with open("scraped_munis.log", "a") as logf:
+                with open(LOG_FILE, "a") as logf:
                     logf.write(f"{idx},no_opendata\n")
                 if driver:
-                    safe_quit(driver, profile_dir)
+                    _end_attempt(observers, driver, profile_dir)
                 attempt = max_attempts
                 continue
 
-            # Wait for OpenData page
-            WebDriverWait(driver, 10).until(EC.url_contains("opendata.html"))
+            # Click it and wait for OpenData page
+            with _host_slot(driver, driver.current_url) as slot:
+                driver.execute_script("arguments[0].click();", opendata_link)
+                _wait(driver, 10).until(EC.url_contains("opendata.html"))
+                _check_error_page(driver, slot)
             print("Arrived at OpenData page:", driver.current_url)
-            time.sleep(0.5)
+            _pause(driver, 0.5)
+            _checkpoint(observers, driver, "opendata")
 
             # Collect CSV links
             csv_links = driver.find_elements(By.XPATH, "//a[contains(@href, '.csv')]")
@@ -458,9 +649,9 @@ def scrape_single_muni(idx):
                 csv_url_list.append({"text": text, "url": href})
 
             # Save results
-            os.makedirs("2021/data_links", exist_ok=True)
+            os.makedirs(DATA_LINKS_DIR, exist_ok=True)
             muni_name_safe = muni_name.replace("/", "_").replace("\\", "_")
-            output_file = f"2021/data_links/{muni_name_safe}_data_links.csv"
+            output_file = os.path.join(DATA_LINKS_DIR, f"{muni_name_safe}_data_links.csv")
             
             with open(output_file, "w", encoding="utf-8", newline='') as f:
                 writer = csv.DictWriter(f, fieldnames=["text", "url"])
@@ -470,11 +661,11 @@ def scrape_single_muni(idx):
             print(f"All found CSV URLs saved to {output_file}")
 
             # Log success
-            with open("scraped_munis.log", "a") as logf:
+            with open(LOG_FILE, "a") as logf:
                 logf.write(f"{idx},success\n")
             
             if driver:
-                safe_quit(driver, profile_dir)
+                _end_attempt(observers, driver, profile_dir)
             break  # Success!
 
         except Exception as e:
@@ -484,28 +675,42 @@ def scrape_single_muni(idx):
             else:
                 print(f"Error scraping municipality #{idx} (attempt {attempt + 1}): {e}")
             
-            with open("scraped_munis.log", "a") as logf:
+            with open(LOG_FILE, "a") as logf:
                 logf.write(f"{idx},failed,attempt_{attempt},{str(e)[:100]}\n")
             
             if driver:
-                safe_quit(driver, profile_dir)
+                _end_attempt(observers, driver, profile_dir)
             attempt += 1
 
-def main():
-    """Main execution function - NO THREADING for Codespaces"""
-    # Start with a small test range
-    muni_indices = list(range(2975, 3000)) #need to do from x to 3000
-    
-    print(f"Starting scraper for {len(muni_indices)} municipalities")
-    
-    # Resume logic
+def load_processed(log_file=None):
+    """Municipality numbers with a final outcome in the log (resume logic)."""
     try:
-        with open("scraped_munis.log", "r") as logf:
-            scraped = set(int(line.split(",")[0]) for line in logf if "success" in line or "bayern_skip" in line or "no_bundestagswahl" in line or "no_opendata" in line)
-        print(f"Found {len(scraped)} already processed municipalities")
+        with open(log_file or LOG_FILE, "r") as logf:
+            return set(int(line.split(",")[0]) for line in logf if "success" in line or "bayern_skip" in line or "no_bundestagswahl" in line or "no_opendata" in line)
     except FileNotFoundError:
+        return None
+
+def run(muni_indices, workers=1, resume=True):
+    """Scrape the given municipality numbers, skipping those already done (unless resume=False)."""
+    from tqdm import tqdm
+
+    print(f"Starting scraper for {len(muni_indices)} municipalities")
+
+    if PAGE_MODE == "replay":
+        # a replay exists to re-run the current extraction logic: start from an
+        # empty log every time instead of skipping what the last replay did
+        muni_indices = replayable(muni_indices)
+        resume = False
+        os.makedirs(os.path.dirname(LOG_FILE) or ".", exist_ok=True)
+        open(LOG_FILE, "w").close()
+
+    # Resume logic
+    scraped = load_processed() if resume else set()
+    if scraped is None:
         scraped = set()
         print("No previous log found, starting fresh")
+    elif resume:
+        print(f"Found {len(scraped)} already processed municipalities")
 
     # Filter out completed municipalities
     muni_indices = [i for i in muni_indices if i not in scraped]
@@ -515,18 +720,83 @@ def main():
         print("All municipalities already processed!")
         return
 
+    # once per run, before any worker starts its Chrome: profiles of running
+    # browsers are younger than the threshold and stay in place
+    if PAGE_MODE != "replay":
+        _cleanup_stale_profiles()
+
+    if workers > 1:
+        # one Chrome per worker thread (each with its own user-data-dir),
+        # or one tab per worker with the tabs backend
+        try:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(scrape_single_muni, idx) for idx in muni_indices]
+                for _ in tqdm(concurrent.futures.as_completed(futures), total=len(futures), desc="Scraping municipalities"):
+                    _write_throttle_metrics()
+        finally:
+            shutdown_tab_pool()
+        throttle.THROTTLE.print_metrics()
+        print("Scraping complete!")
+        return
+
     # Process municipalities ONE BY ONE (no threading)
     for idx in tqdm(muni_indices, desc="Scraping municipalities"):
         scrape_single_muni(idx)
+        _write_throttle_metrics()
         
         # Brief pause between municipalities
-        time.sleep(0.3)
+        if PAGE_MODE != "replay":
+            time.sleep(0.3)
         
         # Progress update every 5 municipalities
         if idx % 5 == 0:
             print(f"Completed municipality #{idx}")
 
+    shutdown_tab_pool()
+    throttle.THROTTLE.print_metrics()
     print("Scraping complete!")
 
+def harvest_municipality_list(output_csv=None, max_pages=None):
+    """Walk the votemanager listing page by page and write Name,Ort,Bundesland,Page rows."""
+    output_csv = output_csv or MUNICIPALITIES_CSV
+    driver, profile_dir = get_chrome_driver()
+    rows = []
+    try:
+        driver.get(MAIN_URL)
+        page = 1
+        while True:
+            table_rows = _wait(driver, 10).until(
+                EC.presence_of_all_elements_located((By.XPATH, LISTING_ROWS_XPATH))
+            )
+            for tr in table_rows:
+                cells = tr.find_elements(By.TAG_NAME, "td")
+                if len(cells) < 3:
+                    continue
+                rows.append({"Name": cells[0].text.strip(), "Ort": cells[1].text.strip(),
+                             "Bundesland": cells[2].text.strip(), "Page": page})
+            if max_pages and page >= max_pages:
+                break
+            # DataTables marks the 'weiter' button disabled on the last page
+            if driver.find_elements(By.CSS_SELECTOR, "#ergebnisTabelle_next.disabled"):
+                break
+            if not _click_next_page(driver):
+                break
+            page += 1
+            _pause(driver, 0.3)
+    finally:
+        safe_quit(driver, profile_dir)
+
+    with open(output_csv, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["Name", "Ort", "Bundesland", "Page"])
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"Wrote {len(rows)} municipalities ({page} pages) to {output_csv}")
+    return rows
+
+def main():
+    """Main execution function - NO THREADING for Codespaces"""
+    # Start with a small test range
+    run(list(range(*DEFAULT_RANGE))) #need to do from x to 3000
+
 if __name__ == "__main__":
     main()
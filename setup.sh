@@ -10,7 +10,7 @@ sudo apt-get install -y chromium-browser chromium-chromedriver
 
 # Install Python packages
 echo "Installing Python packages..."
-pip install selenium tqdm
+pip install selenium webdriver-manager tqdm zstandard
 
 # Create directories
 echo "Creating directories..."
@@ -22,4 +22,4 @@ which chromium-browser
 which chromedriver
 python -c "import selenium; print('Selenium version:', selenium.__version__)"
 
-echo "Setup complete! Run: python scraper_codespaces.py"
+echo "Setup complete! Run: python cli.py doctor && python cli.py scrape --range 2975 3000"
@@ -0,0 +1,232 @@
+# Content-addressed store for downloaded election files.
+#
+#   2021/store/objects/<aa>/<sha256>.zst   one compressed object per distinct payload
+#   2021/store/index.csv                   muni,text,url,key,sha256,size (append-only)
+#
+# Objects are keyed by the SHA-256 of the raw bytes, so identical files linked
+# from several Landkreis/Gemeinde pages or re-downloaded with a different
+# ?ts= are stored once. The index maps every municipality's data_links entry
+# to its object; `key` is the URL without the ?ts= cache buster. zstd is used
+# when the `zstandard` package is installed, gzip otherwise (the codec is the
+# object's file suffix, so both can coexist).
+import csv
+import gzip
+import hashlib
+import os
+import threading
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+STORE_DIR = os.path.join(ROOT, "2021", "store")
+INDEX_FIELDS = ["muni", "text", "url", "key", "sha256", "size"]
+ZSTD_LEVEL = 19
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# query parameters that only defeat caches and never change the payload
+VOLATILE_PARAMS = ("ts",)
+
+
+def url_key(url: str) -> str:
+    """URL without cache-busting parameters (?ts=...)."""
+    parts = urlsplit(url)
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k not in VOLATILE_PARAMS]
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), ""))
+
+
+class Store:
+    def __init__(self, path=STORE_DIR):
+        self.path = path
+        self.objects_dir = os.path.join(path, "objects")
+        self.index_path = os.path.join(path, "index.csv")
+        self._lock = threading.Lock()
+        self._by_muni = None
+        self._by_key = None
+
+    # --- index -----------------------------------------------------------
+
+    def _load_index(self):
+        if self._by_muni is not None:
+            return
+        by_muni, by_key = {}, {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path, newline="", encoding="utf-8") as f:
+                for r in csv.DictReader(f):
+                    # later rows win: a refreshed download replaces the older entry
+                    by_muni.setdefault(r["muni"], {})[r["key"]] = r
+                    by_key[r["key"]] = r
+        self._by_muni, self._by_key = by_muni, by_key
+
+    def _append_index(self, row):
+        os.makedirs(self.path, exist_ok=True)
+        new = not os.path.exists(self.index_path)
+        with open(self.index_path, "a", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=INDEX_FIELDS)
+            if new:
+                writer.writeheader()
+            writer.writerow(row)
+        self._by_muni.setdefault(row["muni"], {})[row["key"]] = row
+        self._by_key[row["key"]] = row
+
+    def entries(self, muni):
+        """Index rows of one municipality, keyed by URL key."""
+        with self._lock:
+            self._load_index()
+            return dict(self._by_muni.get(muni, {}))
+
+    def lookup(self, muni, url):
+        """sha256 of the file behind `url` for `muni`, or None if not stored."""
+        row = self.entries(muni).get(url_key(url))
+        return row["sha256"] if row else None
+
+    def lookup_any(self, url):
+        """Index row stored for this URL by any municipality (shared Landkreis files)."""
+        with self._lock:
+            self._load_index()
+            return self._by_key.get(url_key(url))
+
+    def resolve(self, muni, link):
+        """sha256 for a data_links URL or link text (e.g. 'Gemeinde-Ergebnis') of `muni`."""
+        entries = self.entries(muni)
+        row = entries.get(url_key(link))
+        if row:
+            return row["sha256"]
+        matches = [r for r in entries.values() if r["text"] == link]
+        # the same text is used for every election on the page; prefer the Bundestagswahl
+        matches.sort(key=lambda r: "bundestag" not in r["url"].lower())
+        return matches[0]["sha256"] if matches else None
+
+    # --- objects ---------------------------------------------------------
+
+    def _object_path(self, digest, suffix):
+        return os.path.join(self.objects_dir, digest[:2], digest + suffix)
+
+    def object_path(self, digest):
+        """Path of the stored object, whichever codec wrote it; None if missing."""
+        for suffix in (".zst", ".gz"):
+            p = self._object_path(digest, suffix)
+            if os.path.exists(p):
+                return p
+        return None
+
+    def put_bytes(self, data: bytes) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        if self.object_path(digest):
+            return digest
+        if zstandard is not None:
+            path = self._object_path(digest, ".zst")
+            blob = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+        else:
+            path = self._object_path(digest, ".gz")
+            blob = gzip.compress(data, compresslevel=9, mtime=0)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.part"
+        with open(tmp, "wb") as f:
+            f.write(blob)
+        os.replace(tmp, path)
+        return digest
+
+    def add(self, muni, text, url, data: bytes) -> str:
+        """Store `data` (once per distinct payload) and index it under muni/url."""
+        return self.link(muni, text, url, self.put_bytes(data), len(data))
+
+    def link(self, muni, text, url, digest, size) -> str:
+        """Index an already stored object under another municipality/URL without refetching."""
+        row = {"muni": muni, "text": text, "url": url, "key": url_key(url), "sha256": digest, "size": size}
+        with self._lock:
+            self._load_index()
+            current = self._by_muni.get(muni, {}).get(row["key"])
+            if not current or current["sha256"] != digest or current["text"] != text:
+                self._append_index(row)
+        return digest
+
+    def open_stream(self, digest):
+        """Binary file object streaming the decompressed payload."""
+        path = self.object_path(digest)
+        if path is None:
+            raise FileNotFoundError(f"object {digest} not in store")
+        if path.endswith(".zst"):
+            if zstandard is None:
+                raise RuntimeError("object is zstd-compressed; pip install zstandard")
+            return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+        return gzip.open(path, "rb")
+
+    def read_bytes(self, digest) -> bytes:
+        with self.open_stream(digest) as f:
+            return f.read()
+
+    # --- maintenance -----------------------------------------------------
+
+    def stats(self):
+        with self._lock:
+            self._load_index()
+            rows = [r for rows in self._by_muni.values() for r in rows.values()]
+        logical = sum(int(r["size"]) for r in rows)
+        unique = {r["sha256"]: int(r["size"]) for r in rows}
+        stored = 0
+        for digest in unique:
+            p = self.object_path(digest)
+            if p:
+                stored += os.path.getsize(p)
+        return {"links": len(rows), "objects": len(unique), "logical_bytes": logical,
+                "unique_bytes": sum(unique.values()), "stored_bytes": stored}
+
+    def ingest_dir(self, data_links, local_path_for):
+        """
+        Move files from the old 2021/opendata/<muni>/ layout into the store.
+        A file is indexed for every data_links row pointing at it and deleted
+        only after its stored object reads back identical; emptied municipality
+        folders are removed. Returns the number of files moved.
+        """
+        refs = {}
+        for muni, rows in data_links:
+            for r in rows:
+                path = local_path_for(muni, r["url"])
+                if os.path.exists(path):
+                    refs.setdefault(path, []).append((muni, r))
+        count = 0
+        for path, rows in refs.items():
+            with open(path, "rb") as f:
+                data = f.read()
+            digests = {self.add(muni, r.get("text", ""), r["url"], data) for muni, r in rows}
+            if any(self.read_bytes(digest) != data for digest in digests):
+                print(f"Stored copy of {path} does not match, keeping the file")
+                continue
+            os.remove(path)
+            try:
+                os.rmdir(os.path.dirname(path))
+            except OSError:
+                pass  # other files still in the folder
+            count += 1
+        return count
+
+    def verify(self, data_links):
+        """
+        (resolved, missing): a data_links row resolves when both its URL and its
+        link text (Store.resolve) lead to a stored object. Missing rows are
+        returned as (muni, text, url).
+        """
+        resolved, missing = 0, []
+        for muni, rows in data_links:
+            for r in rows:
+                text = r.get("text", "")
+                links = [r["url"], text] if text else [r["url"]]
+                digests = [self.resolve(muni, link) for link in links]
+                if all(d and self.object_path(d) for d in digests):
+                    resolved += 1
+                else:
+                    missing.append((muni, text, r["url"]))
+        return resolved, missing
+
+
+_default = None
+
+
+def default_store():
+    global _default
+    if _default is None:
+        _default = Store()
+    return _default
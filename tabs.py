@@ -0,0 +1,264 @@
+# Many municipality pipelines inside one headless Chrome.
+#
+# TabPool starts a single browser and hands out TabDriver objects, one per
+# scrape attempt. Each tab lives in its own browser context (separate
+# cookies/storage, opened via CDP Target.createBrowserContext) when the
+# driver supports it, otherwise in a plain new tab.
+#
+# A WebDriver session only has one "current window", so TabDriver/TabElement
+# take the pool lock for each command and switch to their tab first. The
+# browser runs with pageLoadStrategy "none", so nothing in chromedriver waits
+# for a document: TabDriver.get() and every current_url/find_element(s) call
+# poll until the tab's document is complete (outside the lock), which covers
+# navigations started by clicks as well. A failed navigation leaves Chrome on
+# a chrome-error:// page; that is raised as a WebDriverException with the
+# net:: code, as a normal page load would. The tabs load pages concurrently
+# while commands are serialized.
+import json
+import threading
+import time
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.remote.webelement import WebElement
+
+PAGE_LOAD_TIMEOUT = 30
+_NAV_MARKER = "__tabPoolNav"
+# [url, readyState, navigation still pending, net::/ERR_ code of an error page]
+_STATE_JS = (f"var err = location.protocol === 'chrome-error:' && document.body ? "
+             f"document.body.innerText.match(/(net::)?ERR_[A-Z_]+/) : null; "
+             f"return [location.href, document.readyState, !!window.{_NAV_MARKER}, err ? err[0] : null];")
+
+
+def _unwrap(value):
+    if isinstance(value, TabElement):
+        return value._element
+    if isinstance(value, (list, tuple)):
+        return type(value)(_unwrap(v) for v in value)
+    return value
+
+
+class _TabProxy:
+    """Runs attribute access of `target` inside tab `handle` under the pool lock."""
+
+    def __init__(self, tab, target):
+        object.__setattr__(self, "_tab", tab)
+        object.__setattr__(self, "_target", target)
+
+    def __getattr__(self, name):
+        tab = self._tab
+        with tab.pool.lock:
+            tab.pool._focus(tab.handle)
+            value = getattr(self._target, name)
+        if not callable(value):
+            return tab.wrap(value)
+
+        def call(*args, **kwargs):
+            args = [_unwrap(a) for a in args]
+            with tab.pool.lock:
+                tab.pool._focus(tab.handle)
+                result = value(*args, **kwargs)
+            return tab.wrap(result)
+        return call
+
+
+class TabElement(_TabProxy):
+    @property
+    def _element(self):
+        return self._target
+
+
+class TabDriver(_TabProxy):
+    """WebDriver stand-in bound to one tab of a TabPool."""
+
+    def __init__(self, pool, handle, context_id=None):
+        super().__init__(self, pool.driver)
+        object.__setattr__(self, "pool", pool)
+        object.__setattr__(self, "handle", handle)
+        object.__setattr__(self, "context_id", context_id)
+
+    def wrap(self, value):
+        if isinstance(value, WebElement):
+            return TabElement(self, value)
+        if isinstance(value, list) and value and isinstance(value[0], WebElement):
+            return [TabElement(self, v) for v in value]
+        return value
+
+    def _wait_loaded(self, what, navigating=False):
+        """
+        Poll until the tab's document is complete (and, after get(), is the new
+        one); returns its URL. Raises WebDriverException for a chrome-error://
+        page and TimeoutException after PAGE_LOAD_TIMEOUT.
+        """
+        deadline = time.monotonic() + PAGE_LOAD_TIMEOUT
+        while True:
+            try:
+                with self.pool.lock:
+                    self.pool._focus(self.handle)
+                    href, ready, pending, error = self.pool.driver.execute_script(_STATE_JS)
+            except Exception:
+                # the document is being replaced; try again on the next poll
+                href = None
+            if href is not None:
+                if href.startswith("chrome-error://"):
+                    code = error or "ERR_FAILED"
+                    if not code.startswith("net::"):
+                        code = "net::" + code
+                    raise WebDriverException(f"{code} loading {what}")
+                if ready == "complete" and not (navigating and pending):
+                    return href
+            if time.monotonic() >= deadline:
+                raise TimeoutException(f"Timed out loading {what} in tab {self.handle}")
+            time.sleep(0.1)
+
+    def get(self, url):
+        """Start navigation without blocking the session, then wait for the new document."""
+        with self.pool.lock:
+            self.pool._focus(self.handle)
+            self.pool.driver.execute_script(f"window.{_NAV_MARKER} = true;")
+            self.pool.driver.get(url)
+        self._wait_loaded(url, navigating=True)
+
+    @property
+    def current_url(self):
+        # url_contains/url_changes waits see a new URL only once its document is loaded
+        return self._wait_loaded("current page")
+
+    def find_element(self, *args, **kwargs):
+        self._wait_loaded("current page")
+        return self.__getattr__("find_element")(*args, **kwargs)
+
+    def find_elements(self, *args, **kwargs):
+        self._wait_loaded("current page")
+        return self.__getattr__("find_elements")(*args, **kwargs)
+
+    def set_page_load_timeout(self, seconds):
+        pass
+
+    def get_log(self, log_type):
+        if log_type == "performance":
+            return self.pool.drain_performance_log(self.handle)
+        return self.__getattr__("get_log")(log_type)
+
+    def quit(self):
+        self.pool.close_tab(self)
+
+    def close(self):
+        self.pool.close_tab(self)
+
+
+class TabPool:
+    """One Chrome, many tabs. start_browser() must return (driver, profile_dir)."""
+
+    def __init__(self, start_browser, isolated=True):
+        self.start_browser = start_browser
+        self.isolated = isolated
+        self.lock = threading.RLock()
+        self.driver = None
+        self.profile_dir = None
+        self.home = None
+        self._current = None
+        self.open_tabs = 0
+        self._perf = {}
+
+    def _focus(self, handle):
+        if self._current != handle:
+            self.driver.switch_to.window(handle)
+            self._current = handle
+
+    def _ensure_browser(self):
+        if self.driver is not None:
+            try:
+                self.driver.window_handles
+                return
+            except Exception:
+                # browser died: every open tab is gone with it
+                print("[tabs] shared browser is not responding, restarting it")
+                self._quit_browser()
+        self.driver, self.profile_dir = self.start_browser()
+        self.home = self.driver.current_window_handle
+        self._current = self.home
+
+    def _new_context_tab(self):
+        ctx = self.driver.execute_cdp_cmd("Target.createBrowserContext", {"disposeOnDetach": True})
+        context_id = ctx["browserContextId"]
+        target = self.driver.execute_cdp_cmd(
+            "Target.createTarget", {"url": "about:blank", "browserContextId": context_id})
+        handle = target["targetId"]
+        # chromedriver names windows by their DevTools target id
+        for _ in range(20):
+            if handle in self.driver.window_handles:
+                return handle, context_id
+            time.sleep(0.1)
+        self._dispose(handle, context_id)
+        raise RuntimeError("new browser context tab did not show up as a window handle")
+
+    def _dispose(self, handle, context_id):
+        try:
+            self.driver.execute_cdp_cmd("Target.closeTarget", {"targetId": handle})
+        except Exception:
+            pass
+        try:
+            self.driver.execute_cdp_cmd("Target.disposeBrowserContext", {"browserContextId": context_id})
+        except Exception:
+            pass
+
+    def open_tab(self):
+        with self.lock:
+            self._ensure_browser()
+            handle, context_id = None, None
+            if self.isolated and hasattr(self.driver, "execute_cdp_cmd"):
+                try:
+                    handle, context_id = self._new_context_tab()
+                except Exception as e:
+                    print(f"[tabs] isolated context not available ({e}); using plain tabs")
+                    self.isolated = False
+            if handle is None:
+                self._focus(self.home)
+                self.driver.switch_to.new_window("tab")
+                handle = self.driver.current_window_handle
+                self._current = handle
+            self.open_tabs += 1
+            return TabDriver(self, handle, context_id)
+
+    def close_tab(self, tab):
+        with self.lock:
+            if self.driver is None:
+                return
+            try:
+                if tab.context_id:
+                    self._dispose(tab.handle, tab.context_id)
+                else:
+                    self._focus(tab.handle)
+                    self.driver.close()
+            except Exception:
+                pass
+            self.open_tabs = max(0, self.open_tabs - 1)
+            self._current = None
+            self._perf.pop(tab.handle, None)
+
+    def drain_performance_log(self, handle):
+        """
+        The performance log belongs to the session, not to a tab: drain it
+        once and hand each tab the entries of its own target ("webview").
+        """
+        with self.lock:
+            for entry in self.driver.get_log("performance"):
+                try:
+                    webview = json.loads(entry["message"]).get("webview")
+                except Exception:
+                    continue
+                self._perf.setdefault(webview, []).append(entry)
+            return self._perf.pop(handle, [])
+
+    def _quit_browser(self):
+        driver, profile_dir = self.driver, self.profile_dir
+        self.driver, self.profile_dir, self.home, self._current = None, None, None, None
+        self.open_tabs = 0
+        self._perf = {}
+        if driver is not None:
+            from scraper_codespaces import safe_quit
+            safe_quit(driver, profile_dir)
+
+    def shutdown(self):
+        with self.lock:
+            self._quit_browser()
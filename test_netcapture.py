@@ -0,0 +1,108 @@
+# Checks for the DevTools network timing reduction (netcapture.py); stdlib only, no browser.
+#   python -m pytest -q test_netcapture.py
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import netcapture
+
+
+def event(method, **params):
+    return {"message": json.dumps({"message": {"method": method, "params": params}})}
+
+
+def sent(rid, url, ts, rtype="Script"):
+    return event("Network.requestWillBeSent", requestId=rid, request={"url": url}, type=rtype, timestamp=ts)
+
+
+def finished(rid, ts, size=100):
+    return event("Network.loadingFinished", requestId=rid, timestamp=ts, encodedDataLength=size)
+
+
+def navigated(parent=None):
+    frame = {"id": "child" if parent else "main"}
+    if parent:
+        frame["parentId"] = parent
+    return event("Page.frameNavigated", frame=frame)
+
+
+def dom_content_loaded(ts):
+    return event("Page.domContentEventFired", timestamp=ts)
+
+
+class FakeDriver:
+    """get_log("performance") hands out one batch per call, like the real (draining) log."""
+
+    def __init__(self, batches):
+        self.batches = list(batches)
+
+    def get_log(self, log_type):
+        return self.batches.pop(0) if self.batches else []
+
+
+class SummarizeTest(unittest.TestCase):
+    def test_timing_math(self):
+        timing = {"requestTime": 10.0, "dnsStart": 1.0, "dnsEnd": 4.0, "connectStart": 4.0, "connectEnd": 9.0,
+                  "sslStart": -1, "sslEnd": -1, "sendEnd": 10.0, "receiveHeadersEnd": 60.0}
+        rows = netcapture.summarize([
+            sent("1", "https://a.de/x.csv", 10.0, "Other"),
+            event("Network.responseReceived", requestId="1", type="Other",
+                  response={"status": 200, "timing": timing, "encodedDataLength": 50}),
+            finished("1", 10.2, 5000),
+        ])
+        self.assertEqual(len(rows), 1)
+        r = rows[0]
+        self.assertEqual((r["host"], r["status"], r["bytes"]), ("a.de", 200, 5000))
+        self.assertEqual((r["dns"], r["connect"], r["ssl"]), (3.0, 5.0, None))
+        self.assertEqual(r["ttfb"], 50.0)
+        self.assertEqual(r["download"], 140.0)
+        self.assertEqual(r["total"], 200.0)
+
+    def test_render_blocking_per_page(self):
+        rows = {r["url"]: r for r in netcapture.summarize([
+            navigated(), sent("1", "https://a.de/a.js", 1.0), finished("1", 1.1), dom_content_loaded(1.2),
+            sent("2", "https://b.de/", 2.0, "Document"), navigated(),
+            sent("3", "https://b.de/b.js", 2.1), finished("3", 2.2),
+            navigated(parent="main"), dom_content_loaded(2.5),
+            sent("4", "https://b.de/late.js", 3.0), finished("4", 3.1),
+        ])}
+        self.assertTrue(rows["https://a.de/a.js"]["blocking"])
+        self.assertTrue(rows["https://b.de/b.js"]["blocking"])
+        self.assertFalse(rows["https://b.de/late.js"]["blocking"])
+
+
+class NetCaptureTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_request_finishing_in_a_later_drain(self):
+        driver = FakeDriver([
+            [sent("1", "https://a.de/x", 1.0), sent("2", "https://b.de/y", 1.0), finished("1", 1.5)],
+            [finished("2", 3.0), sent("3", "https://c.de/z", 3.1)],
+        ])
+        capture = netcapture.NetCapture(7, 0, self.dir)
+        capture.snapshot(driver, "listing")
+        rows = netcapture.load(os.path.join(self.dir, netcapture.REQUESTS_FILE))
+        self.assertEqual([r["url"] for r in rows], ["https://a.de/x"])
+
+        capture.snapshot(driver, "muni")
+        capture.flush(driver)
+        rows = {r["url"]: r for r in netcapture.load(os.path.join(self.dir, netcapture.REQUESTS_FILE))}
+        self.assertEqual(rows["https://b.de/y"]["total"], 2000.0)
+        self.assertEqual(rows["https://b.de/y"]["step"], "listing")
+        # still in flight when the attempt ended
+        self.assertIsNone(rows["https://c.de/z"]["total"])
+        self.assertEqual(rows["https://c.de/z"]["step"], "muni")
+        self.assertEqual({r["idx"] for r in rows.values()}, {7})
+
+
+if __name__ == "__main__":
+    unittest.main()
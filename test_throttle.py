@@ -0,0 +1,94 @@
+# Checks for the per-host AIMD throttle (throttle.py); stdlib only, no browser.
+#   python -m pytest -q test_throttle.py
+import os
+import sys
+import threading
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import throttle
+
+
+class TimeoutException(Exception):
+    """Stands in for selenium's TimeoutException (classified by class name)."""
+
+
+class ThrottleTest(unittest.TestCase):
+    def setUp(self):
+        self.t = throttle.Throttle(initial=4.0, max_limit=8.0)
+
+    def _limit(self, host="h.de"):
+        return self.t.metrics()[host]["limit"]
+
+    def test_timeout_halves_limit_once_per_cooldown(self):
+        for _ in range(3):
+            with self.assertRaises(TimeoutException):
+                with self.t.slot("https://h.de/a"):
+                    raise TimeoutException("timed out")
+        self.assertEqual(self._limit(), 2.0)
+        self.assertEqual(self.t.metrics()["h.de"]["errors"], 3)
+
+    def test_limit_never_below_minimum(self):
+        with mock.patch.object(throttle.time, "monotonic", side_effect=[float(i * 10) for i in range(100)]):
+            for _ in range(5):
+                with self.t.slot("https://h.de/a") as s:
+                    s.fail("503 service unavailable")
+        self.assertEqual(self._limit(), throttle.MIN_LIMIT)
+
+    def test_no_growth_when_unsaturated(self):
+        for _ in range(20):
+            with self.t.slot("https://h.de/a"):
+                pass
+        self.assertEqual(self._limit(), 4.0)
+
+    def test_growth_when_saturated(self):
+        t = throttle.Throttle(initial=2.0)
+        inside = threading.Barrier(2)
+
+        def request():
+            with t.slot("https://h.de/a"):
+                inside.wait(timeout=5)
+
+        threads = [threading.Thread(target=request) for _ in range(2)]
+        for th in threads:
+            th.start()
+        for th in threads:
+            th.join()
+        self.assertGreater(t.metrics()["h.de"]["limit"], 2.0)
+
+    def test_other_errors_leave_limit_alone(self):
+        with self.assertRaises(KeyError):
+            with self.t.slot("https://h.de/a"):
+                raise KeyError("no such element")
+        self.assertEqual(self._limit(), 4.0)
+        self.assertEqual(self.t.metrics()["h.de"]["errors"], 0)
+
+    def test_has_capacity(self):
+        with self.t.slot("https://h.de/a"):
+            self.assertTrue(self.t.has_capacity("h.de"))
+        self.t.enabled = False
+        self.assertTrue(self.t.has_capacity("h.de"))
+
+
+class ClassificationTest(unittest.TestCase):
+    def test_throttle_errors(self):
+        for error in (TimeoutException("x"), TimeoutError("x"), Exception("net::ERR_CONNECTION_RESET"),
+                      Exception("HTTP Error 429: Too Many Requests"), "error page: 503 Service Unavailable"):
+            self.assertTrue(throttle.is_throttle_error(error), error)
+
+    def test_status_attribute(self):
+        err = Exception("x")
+        err.code = 404
+        self.assertFalse(throttle.is_throttle_error(err))
+        err.code = 502
+        self.assertTrue(throttle.is_throttle_error(err))
+
+    def test_other_errors(self):
+        for error in (None, Exception("no such element: mehr"), "Wahlbezirk 4290"):
+            self.assertFalse(throttle.is_throttle_error(error), error)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,181 @@
+# AIMD (additive increase, multiplicative decrease) concurrency control per remote host.
+#
+# Every navigation/download takes a slot for its host. While requests to a host
+# succeed with healthy latency while all its slots are in use, its limit grows
+# by ~1 slot per `limit` successes (one step per "round"); a host that never
+# fills its slots keeps its limit. A timeout, 429/5xx or net:: error halves it, at most
+# once per cooldown so a burst of failures from the same episode counts once.
+# Slow-but-successful requests hold the limit where it is.
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+INITIAL_LIMIT = 2.0
+MIN_LIMIT = 1.0
+MAX_LIMIT = 8.0
+DECREASE_FACTOR = 0.5
+# a request is "slow" above max(LATENCY_FLOOR, LATENCY_FACTOR * best smoothed latency)
+LATENCY_FLOOR = 2.0
+LATENCY_FACTOR = 3.0
+EWMA_ALPHA = 0.2
+DECREASE_COOLDOWN = 5.0
+
+_ERROR_MARKERS = ("net::", "timed out", "timeout", "too many requests", "service unavailable",
+                  "bad gateway", "gateway time", "internal server error", "connection reset",
+                  "connection refused", "err_")
+
+
+def host_of(url):
+    return (urlsplit(url).hostname or "").lower()
+
+
+def is_throttle_error(error):
+    """True for failures that mean 'back off': timeouts, 429/5xx, net:: / connection errors."""
+    if error is None:
+        return False
+    status = getattr(error, "code", None) or getattr(error, "status", None)
+    if isinstance(status, int):
+        return status == 429 or status >= 500
+    if type(error).__name__ in ("TimeoutException", "TimeoutError"):
+        return True
+    text = str(error).lower()
+    if any(m in text for m in _ERROR_MARKERS):
+        return True
+    return any(code in text.split() for code in ("429", "500", "502", "503", "504"))
+
+
+class HostState:
+    def __init__(self, host, initial=INITIAL_LIMIT):
+        self.host = host
+        self.limit = initial
+        self.in_flight = 0
+        self.ok = 0
+        self.errors = 0
+        self.slow = 0
+        self.ewma = None
+        self.best = None
+        self.last_decrease = 0.0
+        self.first_seen = time.monotonic()
+
+    def snapshot(self):
+        return {"limit": round(self.limit, 2), "in_flight": self.in_flight, "ok": self.ok,
+                "errors": self.errors, "slow": self.slow,
+                "latency_ms": round(self.ewma * 1000) if self.ewma is not None else None,
+                "req_per_s": round(self.ok / max(time.monotonic() - self.first_seen, 1e-3), 2)}
+
+
+class Slot:
+    def __init__(self):
+        self.error = None
+
+    def fail(self, error):
+        """Mark this request as failed even though no exception escaped the block."""
+        self.error = error
+
+
+class Throttle:
+    def __init__(self, initial=INITIAL_LIMIT, min_limit=MIN_LIMIT, max_limit=MAX_LIMIT, enabled=True):
+        self.initial = initial
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.enabled = enabled
+        self._hosts = {}
+        self._cond = threading.Condition()
+
+    def _state(self, host):
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = HostState(host, min(self.initial, self.max_limit))
+        return state
+
+    def acquire(self, host):
+        with self._cond:
+            state = self._state(host)
+            while state.in_flight >= max(1, int(state.limit)):
+                self._cond.wait()
+            state.in_flight += 1
+            return state
+
+    def has_capacity(self, host):
+        """True if a slot for `host` is free right now (always when disabled)."""
+        if not self.enabled or not host:
+            return True
+        with self._cond:
+            state = self._state(host)
+            return state.in_flight < max(1, int(state.limit))
+
+    def release(self, state, latency, error=None):
+        with self._cond:
+            # only a host running at its limit has shown it could use more slots
+            saturated = state.in_flight >= max(1, int(state.limit))
+            state.in_flight -= 1
+            now = time.monotonic()
+            if is_throttle_error(error):
+                state.errors += 1
+                if now - state.last_decrease >= DECREASE_COOLDOWN:
+                    state.limit = max(self.min_limit, state.limit * DECREASE_FACTOR)
+                    state.last_decrease = now
+            elif error is None:
+                state.ok += 1
+                state.ewma = latency if state.ewma is None else (
+                    EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * state.ewma)
+                state.best = state.ewma if state.best is None else min(state.best, state.ewma)
+                if latency > max(LATENCY_FLOOR, LATENCY_FACTOR * state.best):
+                    state.slow += 1
+                elif saturated:
+                    state.limit = min(self.max_limit, state.limit + 1.0 / state.limit)
+            # other errors (missing element, alert, ...) say nothing about the host
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, url):
+        """with throttle.slot(url) as s: ... — exceptions are classified and re-raised."""
+        slot = Slot()
+        host = host_of(url)
+        if not self.enabled or not host:
+            yield slot
+            return
+        state = self.acquire(host)
+        start = time.monotonic()
+        try:
+            yield slot
+        except BaseException as e:
+            slot.error = slot.error or e
+            raise
+        finally:
+            self.release(state, time.monotonic() - start, slot.error)
+
+    def metrics(self):
+        with self._cond:
+            return {h: s.snapshot() for h, s in sorted(self._hosts.items())}
+
+    def write_metrics(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"updated": time.time(), "hosts": self.metrics()}, f, indent=1)
+        os.replace(tmp, path)
+
+    def print_metrics(self, top=30):
+        rows = sorted(self.metrics().items(), key=lambda kv: -(kv[1]["ok"] + kv[1]["errors"]))
+        if not rows:
+            return
+        print(f"Per-host limits (top {top} by requests):")
+        for host, m in rows[:top]:
+            print(f"  limit={m['limit']:5.2f} ok={m['ok']:5} errors={m['errors']:4} slow={m['slow']:4} "
+                  f"latency={m['latency_ms'] or 0:6}ms rate={m['req_per_s']:6.2f}/s  {host}")
+
+
+# process-wide instance shared by the scraper and the downloader
+THROTTLE = Throttle()
+
+
+def configure(enabled=True, max_limit=None, initial=None):
+    THROTTLE.enabled = enabled
+    if max_limit is not None:
+        THROTTLE.max_limit = max_limit
+    if initial is not None:
+        THROTTLE.initial = initial